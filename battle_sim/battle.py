@@ -1,8 +1,32 @@
 import random
 from .combatant import Combatant
+from .spatial import LinearIndex
+
+ENGINES = ('object', 'numpy', 'event', 'group')
 
 class Battle:
-    def __init__(self):
+    def __init__(self, engine='object', spatial_index=LinearIndex, damage_variance=0.0, seed=None,
+                 recorder=None, events=None):
+        # engine: 'object' steps each Combatant in Python,
+        #         'numpy' runs the struct-of-arrays engine (see vector_engine.py)
+        #         'event' runs the discrete-event scheduler, dt is ignored (see event_engine.py)
+        #         'group' collapses identical units at the same spot into groups (see group_engine.py)
+        # spatial_index: factory for the per-team index used by the object
+        #         engine's nearest-enemy targeting (see spatial.py)
+        # damage_variance: each hit is scaled by a uniform factor in
+        #         [1 - v, 1 + v], drawn from an RNG seeded with `seed`
+        # recorder: optional trace.TraceRecorder capturing every step
+        # events: optional event sink (see eco_sim/events.py) for 'start',
+        #         'end' and, with the object engine, 'kill' events. Units
+        #         are labelled by team and add order: 'A0', 'A1', 'B0', ...
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown battle engine: {engine}")
+        self.engine = engine
+        self.spatial_index = spatial_index
+        self.damage_variance = damage_variance
+        self.rng = random.Random(seed)
+        self.recorder = recorder
+        self.events = events if events is not None and events.enabled else None
         self.team_a = []
         self.team_b = []
         self.time = 0.0
@@ -19,19 +43,72 @@ class Battle:
             self.team_b.append(c)
             
     def run(self, dt=0.1, max_time=1000):
-        while self.time < max_time and self.team_a and self.team_b:
+        if self.events is not None:
+            self._labels = {u: f"{team}{i}" for team, units in (('A', self.team_a), ('B', self.team_b))
+                            for i, u in enumerate(units)}
+            self.events.emit(self.time, 'start', None, {'engine': self.engine,
+                                                       'team_a': len(self.team_a), 'team_b': len(self.team_b)})
+        if self.recorder is None:
+            result = self._run(dt, max_time)
+        else:
+            self.recorder.start(self)
+            try:
+                result = self._run(dt, max_time)
+            finally:
+                self.recorder.close()
+        if self.events is not None:
+            self.events.emit(self.time, 'end', None, result)
+        return result
+
+    def _run(self, dt, max_time):
+        if self.engine == 'numpy':
+            from .vector_engine import run_vectorized
+            return run_vectorized(self, dt, max_time)
+        if self.engine == 'event':
+            from .event_engine import run_events
+            return run_events(self, max_time)
+        if self.engine == 'group':
+            from .group_engine import run_groups
+            return run_groups(self, dt, max_time)
+
+        index_a = self.spatial_index()
+        index_b = self.spatial_index()
+        index_a.rebuild(self.team_a)
+        index_b.rebuild(self.team_b)
+        recorder = self.recorder
+
+        while self.time < max_time and index_a and index_b:
             self.time += dt
             
             # Process Team A attacks
-            self._process_team_attacks(self.team_a, self.team_b, dt)
+            kills = self._process_team_attacks(self.team_a, index_a, index_b, dt)
             
             # Process Team B attacks
-            self._process_team_attacks(self.team_b, self.team_a, dt)
+            kills += self._process_team_attacks(self.team_b, index_b, index_a, dt)
             
             # Remove dead
-            self.team_a = [u for u in self.team_a if u.alive]
-            self.team_b = [u for u in self.team_b if u.alive]
+            if kills:
+                self.team_a = [u for u in self.team_a if u.alive]
+                self.team_b = [u for u in self.team_b if u.alive]
+
+            if recorder is not None:
+                recorder.record_units(self.time)
             
+        return self._result()
+
+    def estimate(self):
+        # Lanchester square-law estimate, see lanchester.py. Check the
+        # 'confident' flag and fall back to run() when it is False.
+        from .lanchester import estimate_battle
+        return estimate_battle(self)
+
+    def _roll_damage(self, damage):
+        if not self.damage_variance:
+            return damage
+        v = self.damage_variance
+        return max(1, round(damage * self.rng.uniform(1 - v, 1 + v)))
+
+    def _result(self):
         return {
             'winner': 'A' if self.team_a else ('B' if self.team_b else 'Draw'),
             'time': self.time,
@@ -39,7 +116,8 @@ class Battle:
             'survivors_b': len(self.team_b)
         }
         
-    def _process_team_attacks(self, attackers, defenders, dt):
+    def _process_team_attacks(self, attackers, attacker_index, defender_index, dt):
+        kills = 0
         for unit in attackers:
             if not unit.alive: continue
             
@@ -49,13 +127,12 @@ class Battle:
                 continue
                 
             # Find target (nearest alive defender)
-            live_defenders = [d for d in defenders if d.alive]
-            if not live_defenders:
+            if not defender_index:
                 break
             
             # Simple targeting: nearest enemy
-            if not hasattr(unit, 'target') or unit.target not in live_defenders:
-                unit.target = min(live_defenders, key=lambda d: unit.distance_to(d))
+            if unit.target is None or not unit.target.alive:
+                unit.target = defender_index.nearest(unit.x, unit.y)
             
             target = unit.target
             dist = unit.distance_to(target)
@@ -63,9 +140,17 @@ class Battle:
             # Check range
             if dist <= unit.range + 0.5: # +0.5 buffer for melee touch
                 # Attack
-                damage = unit.calculate_damage(target)
+                damage = self._roll_damage(unit.calculate_damage(target))
                 target.take_damage(damage)
                 unit.cooldown = unit.rof
+                if not target.alive:
+                    defender_index.remove(target)
+                    kills += 1
+                    if self.events is not None:
+                        self.events.emit(self.time, 'kill', self._labels[target],
+                                         {'unit': target.name, 'by': self._labels[unit]})
             else:
                 # Move
                 unit.move_towards(target, dt)
+                attacker_index.update(unit)
+        return kills
@@ -0,0 +1,281 @@
+import bisect
+import math
+import os
+
+from .battle import Battle
+from .lanchester import estimate, unit_terms
+from .prototype import PrototypeRegistry
+
+# Army composition search: the cheapest army from a unit set that beats a
+# given enemy army.
+#
+# Every composition within the resource budget is scored with the Lanchester
+# estimate (microseconds each). Two prunes keep that enumeration small, and
+# neither changes the estimated Pareto front:
+#   - unit types another allowed type matches or beats on every cost and on
+#     every stat against this enemy are dropped; swapping one out never costs
+#     more and never lowers the estimated margin
+#   - the depth-first walk skips a branch once an army already scored costs
+#     no more than the cheapest army in the branch and has a higher estimated
+#     margin than any army in the branch could (see _margin_bound)
+# Units that cost nothing need max_units, or the budget never ends the walk.
+#
+# Full Battle simulations are only spent on the frontier: compositions on the
+# estimated cost-vs-margin Pareto front, plus the cheapest ones (of those left
+# after pruning) the estimate is not confident about. Estimates and
+# simulations are memoized per (army, enemy), so repeated searches against the
+# same enemy only simulate new compositions.
+#
+# Margin is signed: survivors as a fraction of our army when we win, minus the
+# enemy's surviving fraction when we lose, 0 for a draw.
+
+DEFAULT_UNITS_PATH = os.path.join("data", "units.json")
+PRUNE_MARGIN = 1e-9  # a branch is only skipped when strictly beaten
+
+
+def _key(army):
+    return tuple(sorted((name, n) for name, n in army.items() if n))
+
+
+def _margin(result, n_ours, n_theirs):
+    if result['winner'] == 'A':
+        return result['survivors_a'] / n_ours
+    if result['winner'] == 'B':
+        return -result['survivors_b'] / n_theirs
+    return 0.0
+
+
+def _margin_for_ratio(ratio):
+    # _margin of an estimate whose strength_b / strength_a is `ratio`; it only
+    # falls as the ratio grows
+    if ratio < 1:
+        return math.sqrt(1 - ratio)
+    return -math.sqrt(1 - 1 / ratio)
+
+
+class _EstimatedFront:
+    # Estimated cost-vs-margin Pareto front of the compositions scored so far,
+    # as two parallel lists in which both cost and margin increase
+    def __init__(self):
+        self.costs = []
+        self.margins = []
+
+    def best_margin(self, cost):
+        # Best margin of a scored composition costing at most `cost`, or None
+        i = bisect.bisect_right(self.costs, cost)
+        return self.margins[i - 1] if i else None
+
+    def add(self, cost, margin):
+        best = self.best_margin(cost)
+        if best is not None and best >= margin:
+            return
+        i = j = bisect.bisect_left(self.costs, cost)
+        while j < len(self.margins) and self.margins[j] <= margin:
+            j += 1
+        self.costs[i:j] = [cost]
+        self.margins[i:j] = [margin]
+
+
+def pareto_front(candidates):
+    # Keep entries no other entry beats on both cost (lower) and margin (higher)
+    front = []
+    best_margin = None
+    for c in sorted(candidates, key=lambda c: (c['cost'], -c['margin'])):
+        if best_margin is None or c['margin'] > best_margin:
+            front.append(c)
+            best_margin = c['margin']
+    return front
+
+
+class CounterSearch:
+    def __init__(self, units_path=DEFAULT_UNITS_PATH, registry=None, engine='event', dt=0.1, max_time=1000):
+        self.registry = registry if registry is not None else PrototypeRegistry.from_json(units_path)
+        self.engine = engine
+        self.dt = dt
+        self.max_time = max_time
+        self._estimates = {}  # (army key, enemy key) -> estimate
+        self._results = {}    # (army key, enemy key) -> Battle result
+        self.simulations = 0
+
+    def cost(self, army):
+        costs = {}
+        for name, n in army.items():
+            for res, amount in self.registry[name].costs.items():
+                costs[res] = costs.get(res, 0) + amount * n
+        return costs
+
+    def _compositions(self, unit_set, budget, max_units, step, prune=None):
+        # Depth-first over unit counts, never leaving the budget.
+        # prune(i, counts, spent, total): True skips every composition that
+        # keeps the counts of unit_set[:i] (types i and on are still free)
+        per_resource = isinstance(budget, dict)
+        unit_costs = [self.registry[name].costs for name in unit_set]
+        counts = [0] * len(unit_set)
+
+        def fits(spent):
+            if per_resource:
+                return all(spent.get(res, 0) <= budget.get(res, 0) for res in spent)
+            return sum(spent.values()) <= budget
+
+        def walk(i, spent, total):
+            if i == len(unit_set):
+                if total:
+                    yield {name: n for name, n in zip(unit_set, counts) if n}
+                return
+            if prune is not None and prune(i, counts, spent, total):
+                return
+            n = 0
+            current = dict(spent)
+            while True:
+                counts[i] = n
+                yield from walk(i + 1, current, total + n)
+                n += step
+                if max_units is not None and total + n > max_units:
+                    break
+                current = {res: current.get(res, 0) + unit_costs[i].get(res, 0) * step
+                           for res in set(current) | set(unit_costs[i])}
+                if not fits(current):
+                    break
+            counts[i] = 0
+
+        yield from walk(0, {}, 0)
+
+    def _dominates(self, a, b, terms, a_first):
+        # Whether unit type `a` makes `b` redundant: it costs no more of any
+        # resource and is no worse on any stat the estimate uses against this
+        # enemy (terms: unit_terms per name), nor on range and speed, which
+        # the battles use. Identical types keep the first one.
+        pa, pb = self.registry[a], self.registry[b]
+        (dps_a, taken_a, hp_a), (dps_b, taken_b, hp_b) = terms[a], terms[b]
+        costs_a = [pa.costs.get(res, 0) for res in set(pa.costs) | set(pb.costs)]
+        costs_b = [pb.costs.get(res, 0) for res in set(pa.costs) | set(pb.costs)]
+        ours = costs_b + [dps_a, taken_b, hp_a, pa.range, pa.speed]
+        theirs = costs_a + [dps_b, taken_a, hp_b, pb.range, pb.speed]
+        if any(x < y for x, y in zip(ours, theirs)):
+            return False
+        return a_first or any(x > y for x, y in zip(ours, theirs))
+
+    def _room(self, names, budget, spent, max_units, total):
+        # Most units of `names` that still fit on top of `spent`
+        if isinstance(budget, dict):
+            room = 0
+            for name in names:
+                costs = {res: amount for res, amount in self.registry[name].costs.items() if amount > 0}
+                if not costs:
+                    room = math.inf
+                    break
+                room += min((budget.get(res, 0) - spent.get(res, 0)) // amount
+                            for res, amount in costs.items())
+        else:
+            cheapest = min(sum(self.registry[name].costs.values()) for name in names)
+            room = (budget - sum(spent.values())) // cheapest if cheapest > 0 else math.inf
+        if max_units is not None:
+            room = min(room, max_units - total)
+        return max(0, room)
+
+    def _margin_bound(self, unit_set, terms, enemy, i, counts, room):
+        # Highest estimated margin of any composition that keeps counts[:i]
+        # and adds at most `room` units of unit_set[i:]. estimate()'s margin
+        # only falls as strength_b / strength_a grows (see unit_terms), so
+        # take the enemy's damage from the fixed units alone and everything
+        # else as if all `room` units were the best of the free types.
+        fixed = [(counts[j], terms[name]) for j, name in enumerate(unit_set[:i]) if counts[j]]
+        n = sum(c for c, _ in fixed) + room
+        if not n:
+            return 1.0
+        dps = sum(c * t[0] for c, t in fixed) + room * max(terms[name][0] for name in unit_set[i:])
+        taken = sum(c * t[1] for c, t in fixed)
+        hp = sum(c * t[2] for c, t in fixed) + room * max(terms[name][2] for name in unit_set[i:])
+        n_theirs = sum(enemy.values())
+        hp_theirs = sum(p.max_hp * c for p, c in enemy.items()) / n_theirs
+        return _margin_for_ratio(n_theirs * n_theirs * hp_theirs * taken / (hp * dps * n))
+
+    def _estimate(self, army, enemy, enemy_key):
+        key = (_key(army), enemy_key)
+        if key not in self._estimates:
+            ours = {self.registry[name]: n for name, n in army.items()}
+            theirs = {self.registry[name]: n for name, n in enemy.items()}
+            self._estimates[key] = estimate(ours, theirs)
+        return self._estimates[key]
+
+    def _simulate(self, army, enemy, enemy_key):
+        key = (_key(army), enemy_key)
+        if key not in self._results:
+            battle = Battle(engine=self.engine)
+            for name, n in army.items():
+                for _ in range(n):
+                    battle.add_unit('A', name, self.registry[name])
+            for name, n in enemy.items():
+                for _ in range(n):
+                    battle.add_unit('B', name, self.registry[name])
+            self._results[key] = battle.run(dt=self.dt, max_time=self.max_time)
+            self.simulations += 1
+        return self._results[key]
+
+    def search(self, enemy, unit_set, budget, max_units=None, step=1, max_simulations=50):
+        # enemy: {unit name: count}; unit_set: unit names we may build
+        # budget: total resources (number) or {resource: amount}
+        # Returns the simulated cost-vs-margin Pareto set, cheapest first; the
+        # first entry with a positive margin is the cheapest counter found.
+        # max_units: cap on army size, required when a unit costs nothing
+        unit_set = list(dict.fromkeys(unit_set))
+        free = [name for name in unit_set if not any(self.registry[name].costs.values())]
+        if free and max_units is None:
+            raise ValueError(f"max_units is required for units that cost nothing: {', '.join(free)}")
+        if step < 1:
+            raise ValueError(f"step must be at least 1, got {step}")
+        enemy_key = _key(enemy)
+        n_theirs = sum(enemy.values())
+
+        prune = None
+        front = _EstimatedFront()
+        if n_theirs:
+            theirs = {self.registry[name]: n for name, n in enemy.items() if n}
+            terms = {name: unit_terms(self.registry[name], theirs) for name in unit_set}
+            unit_set = [b for j, b in enumerate(unit_set)
+                        if not any(self._dominates(a, b, terms, k < j)
+                                   for k, a in enumerate(unit_set) if k != j)]
+
+            def prune(i, counts, spent, total):
+                best = front.best_margin(sum(spent.values()))
+                if best is None:
+                    return False
+                room = self._room(unit_set[i:], budget, spent, max_units, total)
+                bound = self._margin_bound(unit_set, terms, theirs, i, counts, room)
+                return best >= bound + PRUNE_MARGIN
+
+        scored = []
+        for army in self._compositions(unit_set, budget, max_units, step, prune):
+            est = self._estimate(army, enemy, enemy_key)
+            n_ours = sum(army.values())
+            costs = self.cost(army)
+            scored.append({
+                'army': army,
+                'costs': costs,
+                'cost': sum(costs.values()),
+                'margin': _margin(est, n_ours, n_theirs),
+                'estimate': est,
+            })
+            front.add(scored[-1]['cost'], scored[-1]['margin'])
+
+        # Frontier: the estimated Pareto front first, then the cheapest
+        # compositions the estimate is unsure about
+        frontier = {_key(c['army']): c for c in pareto_front(scored)}
+        for c in sorted(scored, key=lambda c: c['cost']):
+            if len(frontier) >= max_simulations:
+                break
+            if not c['estimate']['confident']:
+                frontier.setdefault(_key(c['army']), c)
+        chosen = list(frontier.values())[:max_simulations]
+
+        simulated = []
+        for c in chosen:
+            result = self._simulate(c['army'], enemy, enemy_key)
+            simulated.append({
+                'army': c['army'],
+                'costs': c['costs'],
+                'cost': c['cost'],
+                'margin': _margin(result, sum(c['army'].values()), n_theirs),
+                'result': result,
+            })
+        return pareto_front(simulated)
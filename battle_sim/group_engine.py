@@ -0,0 +1,253 @@
+import math
+
+# Aggregated unit groups for large homogeneous armies.
+#
+# Units whose whole object-engine state is identical (same prototype, hp,
+# cooldown, exact position and target) behave identically every step, so they
+# are collapsed into one UnitGroup: a count, one hp value shared by every
+# member (the group's hp pool is count * hp), one cooldown phase, one target
+# and one position. A step costs per group and per kill instead of per unit.
+#
+# Engagement is the object engine's. A group's target is a single enemy unit,
+# picked as the nearest one from the group's position, and every member fires
+# at it. A volley that needs fewer hits than the group has to kill its target
+# behaves like the object engine's attackers that find their target already
+# dead: the members with nothing left to hit pick a new target and act in the
+# same tick. Hit-point overflow is per unit, a killing hit's excess is wasted.
+# Groups only split when their members stop behaving alike:
+#   - partial damage: a unit that takes hits without dying breaks off from
+#     its group with its own, lower hp
+#   - different target: the members that fired at a target and the members
+#     that move on to the next one break apart
+# Groups that end up identical again are merged back at the end of every step.
+# Units added at the same spot (e.g. add_unit(..., x=0, y=0) for a whole army)
+# stay grouped; units that start apart rarely come to share a position and
+# mostly fight as singletons, at no gain over the object engine.
+#
+# Tolerance vs the object engine (same dt): damage variance is rolled once per
+# volley rather than per hit, and groups take turns in list order, which after
+# splits and merges is not always team order. That can change which of several
+# equally near units a retargeting attacker picks. Without damage variance,
+# single-type armies, spread out or stacked, give the object engine's result
+# exactly. Mixed armies give the same winner for any matchup that is not a
+# near-draw, survivor counts within a few units and battle time within a few
+# ticks.
+
+
+class UnitGroup:
+    __slots__ = ('prototype', 'members', 'hp', 'cooldown', 'x', 'y', 'target')
+
+    def __init__(self, prototype, members, hp, cooldown, x, y, target=None):
+        self.prototype = prototype
+        self.members = members  # live Combatants, all at `hp`, last in team order first
+        self.hp = hp
+        self.cooldown = cooldown
+        self.x = x
+        self.y = y
+        self.target = target  # a Combatant, or None when it has to retarget
+
+    @property
+    def count(self):
+        return len(self.members)
+
+    @property
+    def alive(self):
+        return bool(self.members)
+
+    def distance_to(self, other):
+        return math.hypot(self.x - other.x, self.y - other.y)
+
+    def key(self):
+        target = self.target if self.target is not None and self.target.alive else None
+        return (self.prototype, self.hp, self.cooldown, self.x, self.y, target)
+
+
+class GroupBattle:
+    def __init__(self, battle):
+        self.battle = battle
+        self.group_of = {}  # Combatant -> its UnitGroup
+        self.groups_a = self._form(battle.team_a)
+        self.groups_b = self._form(battle.team_b)
+
+    def _form(self, units):
+        groups = {}
+        for u in units:
+            if not u.alive:
+                continue
+            target = u.target if u.target is not None and u.target.alive else None
+            key = (u.prototype, u.hp, u.cooldown, u.x, u.y, target)
+            g = groups.get(key)
+            if g is None:
+                g = groups[key] = UnitGroup(u.prototype, [], u.hp, u.cooldown, u.x, u.y, target)
+            g.members.append(u)
+            self.group_of[u] = g
+        for g in groups.values():
+            g.members.reverse()
+        return list(groups.values())
+
+    def _split(self, group, n, **changes):
+        # Break the last n members, the first in team order, off into a new
+        # group with the same state
+        moved = group.members[-n:]
+        del group.members[-n:]
+        part = UnitGroup(group.prototype, moved, group.hp, group.cooldown, group.x, group.y, group.target)
+        for name, value in changes.items():
+            setattr(part, name, value)
+        for u in moved:
+            self.group_of[u] = part
+        return part
+
+    def _detach(self, unit):
+        # Take `unit` out of its group, cheapest from the end of the members
+        group = self.group_of.pop(unit)
+        if group.members[-1] is unit:
+            group.members.pop()
+        else:
+            group.members.remove(unit)
+        return group
+
+    def _merge(self, groups):
+        merged = {}
+        for g in groups:
+            if not g.alive:
+                continue
+            key = g.key()
+            home = merged.get(key)
+            if home is None:
+                merged[key] = g
+                continue
+            if home.count < g.count:
+                # Move the smaller group's members
+                home, g = g, home
+                merged[key] = home
+            home.members.extend(g.members)
+            for u in g.members:
+                self.group_of[u] = home
+            g.members = []
+        return list(merged.values())
+
+    def run(self, dt=0.1, max_time=1000):
+        battle = self.battle
+        while battle.time < max_time and self.groups_a and self.groups_b:
+            battle.time += dt
+            self._process_team(self.groups_a, self.groups_b, dt)
+            self._process_team(self.groups_b, self.groups_a, dt)
+            self.groups_a = self._merge(self.groups_a)
+            self.groups_b = self._merge(self.groups_b)
+            if battle.recorder is not None:
+                self._record()
+
+        self._write_back()
+        return battle._result()
+
+    def _process_team(self, attackers, defenders, dt):
+        i = 0
+        while i < len(attackers):
+            group = attackers[i]
+            if not group.alive:
+                i += 1
+                continue
+
+            # Cooldown management
+            if group.cooldown > 0:
+                group.cooldown -= dt
+                i += 1
+                continue
+
+            spare = self._act(group, defenders, dt)
+            if spare:
+                # The members that fired keep their dead target, the rest
+                # retarget and act right away
+                attackers.insert(i, self._split(group, group.count - spare, cooldown=group.prototype.rof))
+                group.target = None
+            i += 1
+
+    def _act(self, group, defenders, dt):
+        # Attack or move, return how many members are left to act
+        if group.target is None or not group.target.alive:
+            live = [d for d in defenders if d.alive]
+            if not live:
+                return 0
+            group.target = min(live, key=group.distance_to).members[-1]
+
+        target = group.target
+        home = self.group_of[target]
+        proto = group.prototype
+        if group.distance_to(home) > proto.range + 0.5:  # +0.5 buffer for melee touch
+            self._move(group, home, dt)
+            return 0
+
+        armor = target.melee_armor if proto.attack_type == 'Melee' else target.pierce_armor
+        damage = self.battle._roll_damage(max(1, proto.attack - armor))
+        spare = group.count - self._take_volley(target, group.count, damage, defenders)
+        if not spare:
+            group.cooldown = proto.rof
+        return spare
+
+    def _take_volley(self, target, hits, damage, defenders):
+        # Land up to `hits` hits on `target`, return how many were needed
+        home = self.group_of[target]
+        need = -(-home.hp // damage)  # hits to kill it
+        if hits >= need:
+            self._detach(target)
+            target.hp = 0
+            target.alive = False
+            return need
+
+        if home.count > 1:
+            self._detach(target)
+            part = UnitGroup(home.prototype, [target], home.hp, home.cooldown, home.x, home.y, home.target)
+            self.group_of[target] = part
+            defenders.insert(defenders.index(home), part)
+            home = part
+        home.hp -= hits * damage
+        return hits
+
+    def _move(self, group, target, dt):
+        dist = group.distance_to(target)
+        if dist <= 0:
+            return
+        move_dist = group.prototype.speed * dt
+        if move_dist >= dist:
+            group.x = target.x
+            group.y = target.y
+        else:
+            ratio = move_dist / dist
+            group.x += (target.x - group.x) * ratio
+            group.y += (target.y - group.y) * ratio
+
+    def _record(self):
+        # Members stand at their group's position and share its hp and target
+        recorder = self.battle.recorder
+        n = len(recorder.units)
+        x = [0.0] * n
+        y = [0.0] * n
+        hp = [0] * n
+        target = [-1] * n
+        for groups in (self.groups_a, self.groups_b):
+            for g in groups:
+                t = recorder.index.get(g.target, -1)
+                for u in g.members:
+                    i = recorder.index[u]
+                    x[i] = g.x
+                    y[i] = g.y
+                    hp[i] = g.hp
+                    target[i] = t
+        recorder.record(self.battle.time, x, y, hp, target)
+
+    def _write_back(self):
+        # Dead members were marked as they fell
+        for groups in (self.groups_a, self.groups_b):
+            for g in groups:
+                for u in g.members:
+                    u.hp = g.hp
+                    u.x = g.x
+                    u.y = g.y
+                    u.cooldown = max(0.0, g.cooldown)
+                    u.target = g.target
+        self.battle.team_a = [u for u in self.battle.team_a if u.alive]
+        self.battle.team_b = [u for u in self.battle.team_b if u.alive]
+
+
+def run_groups(battle, dt=0.1, max_time=1000):
+    return GroupBattle(battle).run(dt, max_time)
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from .battle import Battle
+from .prototype import PrototypeRegistry
+
+# Persistent all-pairs matchup table.
+#
+# For every ordered pair of units (A, B) and every army size N the table holds
+# the outcome of an N-vs-N Battle. It is stored in `cache_dir` as:
+#   matrix.npy - structured array [size, unit_a, unit_b], memory-mapped on load
+#   index.json - units file hash, sizes, engine, unit order and per-unit hashes
+#
+# When the units file content changes, only the rows and columns of units whose
+# own entry changed (or that are new) are re-simulated. Everything else is
+# copied over from the previous table.
+
+DEFAULT_UNITS_PATH = os.path.join("data", "units.json")
+DEFAULT_CACHE_DIR = os.path.join("data", "matchups")
+
+WINNERS = {0: 'Draw', 1: 'A', 2: 'B'}
+WINNER_CODES = {v: k for k, v in WINNERS.items()}
+
+CELL_DTYPE = np.dtype([
+    ('winner', np.int8),
+    ('time', np.float32),
+    ('survivors_a', np.int32),
+    ('survivors_b', np.int32),
+])
+
+
+def _file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _unit_hash(unit):
+    return hashlib.sha256(json.dumps(unit, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+class MatchupMatrix:
+    def __init__(self, units_path=DEFAULT_UNITS_PATH, sizes=(1, 5, 10), cache_dir=DEFAULT_CACHE_DIR,
+                 engine='event', dt=0.1, max_time=1000):
+        self.units_path = units_path
+        self.sizes = tuple(sizes)
+        self.cache_dir = cache_dir
+        self.engine = engine
+        self.dt = dt
+        self.max_time = max_time
+
+        self.names = []
+        self.unit_index = {}   # name -> row/column
+        self.size_index = {n: i for i, n in enumerate(self.sizes)}
+        self.matrix = None
+        self.recomputed = 0    # cells simulated by the last refresh
+
+        self.refresh()
+
+    @property
+    def _matrix_path(self):
+        return os.path.join(self.cache_dir, 'matrix.npy')
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.cache_dir, 'index.json')
+
+    def _load_index(self):
+        try:
+            with open(self._index_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def refresh(self):
+        # Bring the on-disk table up to date with the units file, then map it
+        file_hash = _file_hash(self.units_path)
+        index = self._load_index()
+        settings = {'sizes': list(self.sizes), 'engine': self.engine, 'dt': self.dt, 'max_time': self.max_time}
+
+        self.recomputed = 0
+        self.matrix = None  # release the old mapping before the file is replaced
+        if not (index and index['file_hash'] == file_hash and index['settings'] == settings
+                and os.path.exists(self._matrix_path)):
+            self._rebuild(file_hash, settings, index)
+            index = self._load_index()
+
+        self.names = index['units']
+        self.unit_index = {name: i for i, name in enumerate(self.names)}
+        self.matrix = np.load(self._matrix_path, mmap_mode='r')
+
+    def _rebuild(self, file_hash, settings, old_index):
+        with open(self.units_path, 'r', encoding='utf-8') as f:
+            units = json.load(f)
+        registry = PrototypeRegistry.from_units(units)
+        names = [u['name'] for u in units]
+        hashes = {u['name']: _unit_hash(u) for u in units}
+
+        # Which old cells can be reused
+        old = None
+        old_units = {}
+        old_sizes = {}
+        if old_index and os.path.exists(self._matrix_path):
+            old_settings = dict(old_index['settings'], sizes=None)
+            if old_settings == dict(settings, sizes=None):
+                old = np.load(self._matrix_path, mmap_mode='r')
+                old_units = {name: i for i, name in enumerate(old_index['units'])
+                             if old_index['unit_hashes'].get(name) == hashes.get(name)}
+                old_sizes = {n: i for i, n in enumerate(old_index['settings']['sizes'])}
+
+        matrix = np.zeros((len(self.sizes), len(names), len(names)), dtype=CELL_DTYPE)
+        for s, size in enumerate(self.sizes):
+            for a, name_a in enumerate(names):
+                for b, name_b in enumerate(names):
+                    if old is not None and size in old_sizes and name_a in old_units and name_b in old_units:
+                        matrix[s, a, b] = old[old_sizes[size], old_units[name_a], old_units[name_b]]
+                    else:
+                        matrix[s, a, b] = self._simulate(registry[name_a], registry[name_b], size)
+                        self.recomputed += 1
+        del old
+
+        # Write both files atomically. The index goes first so a crash in
+        # between leaves no index, which forces a full rebuild next time.
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if os.path.exists(self._index_path):
+            os.remove(self._index_path)
+        tmp_matrix = self._matrix_path + '.tmp'
+        with open(tmp_matrix, 'wb') as f:
+            np.save(f, matrix)
+        os.replace(tmp_matrix, self._matrix_path)
+
+        tmp_index = self._index_path + '.tmp'
+        with open(tmp_index, 'w', encoding='utf-8') as f:
+            json.dump({'file_hash': file_hash, 'settings': settings,
+                       'units': names, 'unit_hashes': hashes}, f)
+        os.replace(tmp_index, self._index_path)
+
+    def _simulate(self, proto_a, proto_b, size):
+        battle = Battle(engine=self.engine)
+        for _ in range(size):
+            battle.add_unit('A', proto_a.name, proto_a)
+            battle.add_unit('B', proto_b.name, proto_b)
+        res = battle.run(dt=self.dt, max_time=self.max_time)
+        return (WINNER_CODES[res['winner']], res['time'], res['survivors_a'], res['survivors_b'])
+
+    def lookup(self, unit_a, unit_b, size):
+        cell = self.matrix[self.size_index[size], self.unit_index[unit_a], self.unit_index[unit_b]]
+        return {
+            'winner': WINNERS[int(cell['winner'])],
+            'time': float(cell['time']),
+            'survivors_a': int(cell['survivors_a']),
+            'survivors_b': int(cell['survivors_b']),
+        }
@@ -0,0 +1,122 @@
+import json
+import re
+
+# Unit prototypes: the static, parsed stats of a unit type.
+#
+# The scraped stats in data/units.json are strings ("40", "1.5", "0Hunter:4").
+# They are parsed and validated once per unit type here, and every Combatant of
+# that type shares the same UnitPrototype instead of re-parsing them on spawn.
+
+_NUMBER = re.compile(r'[-+]?\d+(?:\.\d+)?')
+
+
+def _leading_number(name, field, value):
+    # Scraped values sometimes carry a suffix, e.g. Villager range "0Hunter:4"
+    if isinstance(value, (int, float)):
+        return value
+    match = _NUMBER.match(str(value).strip())
+    if not match:
+        raise ValueError(f"{name}: cannot parse {field} {value!r}")
+    return float(match.group())
+
+
+def _int_stat(name, stats, field, default):
+    value = stats.get(field)
+    if value is None or value == '':
+        return default
+    return int(_leading_number(name, field, value))
+
+
+def _float_stat(name, stats, field, default):
+    # Reload time and speed have always fallen back to a default when unparsable
+    value = stats.get(field)
+    if value is None or value == '':
+        return default
+    try:
+        number = float(_leading_number(name, field, value))
+    except ValueError:
+        return default
+    return number if number >= 0 else default
+
+
+class UnitPrototype:
+    __slots__ = ('name', 'data', 'max_hp', 'attack', 'attack_type',
+                 'melee_armor', 'pierce_armor', 'range', 'rof', 'speed', 'costs')
+
+    def __init__(self, name, data):
+        self.name = name
+        self.data = data
+
+        stats = data.get('stats', {})
+        self.max_hp = max(1, _int_stat(name, stats, 'Hit points', 1))
+
+        # Attack: try Melee first, then Pierce
+        melee_atk = _int_stat(name, stats, 'Melee attack', 0)
+        pierce_atk = _int_stat(name, stats, 'Pierce attack', 0)
+        if melee_atk:
+            self.attack = melee_atk
+            self.attack_type = 'Melee'
+        elif pierce_atk:
+            self.attack = pierce_atk
+            self.attack_type = 'Pierce'
+        else:
+            self.attack = 0
+            self.attack_type = 'Melee'
+
+        self.melee_armor = _int_stat(name, stats, 'Melee armor', 0)
+        self.pierce_armor = _int_stat(name, stats, 'Pierce armor', 0)
+        self.range = float(_leading_number(name, 'Range', stats.get('Range', 0) or 0))
+        if self.range < 0:
+            raise ValueError(f"{name}: Range must not be negative, got {stats.get('Range')!r}")
+
+        # ROF (Reload Time) - default to 2.0 if missing (standard-ish)
+        self.rof = _float_stat(name, stats, 'Reload time', 2.0)
+        self.speed = _float_stat(name, stats, 'Speed', 1.0)
+
+        self.costs = {res: int(amount) for res, amount in data.get('costs', {}).items()}
+
+    def __repr__(self):
+        return f"UnitPrototype({self.name!r}, hp={self.max_hp}, attack={self.attack} {self.attack_type})"
+
+
+class PrototypeRegistry:
+    def __init__(self):
+        self._prototypes = {}  # name -> (source data, UnitPrototype)
+
+    @classmethod
+    def from_units(cls, units_list):
+        registry = cls()
+        for u in units_list:
+            registry.get(u['name'], u)
+        return registry
+
+    @classmethod
+    def from_json(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_units(json.load(f))
+
+    def get(self, name, data):
+        # Recompile only if this name is seen with a different data dict.
+        # Unit dicts are treated as read-only once compiled.
+        entry = self._prototypes.get(name)
+        if entry is not None and entry[0] is data:
+            return entry[1]
+        proto = UnitPrototype(name, data)
+        self._prototypes[name] = (data, proto)
+        return proto
+
+    def __getitem__(self, name):
+        return self._prototypes[name][1]
+
+    def __contains__(self, name):
+        return name in self._prototypes
+
+    def __iter__(self):
+        return iter(self._prototypes)
+
+    def __len__(self):
+        return len(self._prototypes)
+
+
+# Shared by Combatant when it is handed raw unit data
+default_registry = PrototypeRegistry()
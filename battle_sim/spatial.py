@@ -0,0 +1,142 @@
+import math
+
+# Spatial indexes used for nearest-enemy targeting.
+#
+# Each index holds the live units of one team and supports:
+#   rebuild(units)  - (re)insert a whole team, in team order
+#   update(unit)    - unit has moved
+#   remove(unit)    - unit has died
+#   nearest(x, y)   - closest live unit, or None
+#   __len__         - number of live units
+#
+# Ties on distance go to the unit that comes first in team order, which is the
+# same choice `min(live_defenders, key=distance)` makes.
+
+
+class LinearIndex:
+    def __init__(self):
+        self.units = {}  # unit -> team order (dict keeps insertion order)
+
+    def rebuild(self, units):
+        self.units = {u: i for i, u in enumerate(units) if u.alive}
+
+    def update(self, unit):
+        pass
+
+    def remove(self, unit):
+        self.units.pop(unit, None)
+
+    def nearest(self, x, y):
+        best = None
+        best_d2 = math.inf
+        for u in self.units:
+            d2 = (u.x - x) ** 2 + (u.y - y) ** 2
+            if d2 < best_d2:
+                best = u
+                best_d2 = d2
+        return best
+
+    def __len__(self):
+        return len(self.units)
+
+
+class UniformGrid:
+    def __init__(self, cell_size=4.0):
+        self.cell_size = cell_size
+        self.cells = {}    # (cx, cy) -> {unit: order}
+        self.where = {}    # unit -> (cx, cy)
+        self.order = {}    # unit -> team order
+        self.bounds = (0, 0, -1, -1)  # occupied cell range, only grows until rebuild
+
+    def _cell(self, x, y):
+        return (math.floor(x / self.cell_size), math.floor(y / self.cell_size))
+
+    def rebuild(self, units):
+        self.cells = {}
+        self.where = {}
+        self.order = {}
+        self.bounds = (0, 0, -1, -1)
+        for i, u in enumerate(units):
+            if not u.alive:
+                continue
+            self.order[u] = i
+            self._insert(u, self._cell(u.x, u.y))
+
+    def _insert(self, unit, cell):
+        min_x, min_y, max_x, max_y = self.bounds
+        if min_x > max_x:
+            self.bounds = (cell[0], cell[1], cell[0], cell[1])
+        else:
+            self.bounds = (min(min_x, cell[0]), min(min_y, cell[1]),
+                           max(max_x, cell[0]), max(max_y, cell[1]))
+        self.cells.setdefault(cell, {})[unit] = self.order[unit]
+        self.where[unit] = cell
+
+    def _discard(self, unit):
+        cell = self.where.pop(unit)
+        bucket = self.cells[cell]
+        del bucket[unit]
+        if not bucket:
+            del self.cells[cell]
+
+    def update(self, unit):
+        cell = self._cell(unit.x, unit.y)
+        if self.where.get(unit) != cell:
+            self._discard(unit)
+            self._insert(unit, cell)
+
+    def remove(self, unit):
+        if unit in self.where:
+            self._discard(unit)
+            del self.order[unit]
+
+    def nearest(self, x, y):
+        if not self.where:
+            return None
+
+        cx, cy = self._cell(x, y)
+        min_x, min_y, max_x, max_y = self.bounds
+        max_ring = max(cx - min_x, max_x - cx, cy - min_y, max_y - cy)
+        best = None
+        best_key = (math.inf, math.inf)
+
+        # Expand square rings of cells until nothing closer can exist
+        for ring in range(max_ring + 1):
+            for cell in self._ring_cells(cx, cy, ring):
+                bucket = self.cells.get(cell)
+                if not bucket:
+                    continue
+                for u, order in bucket.items():
+                    key = ((u.x - x) ** 2 + (u.y - y) ** 2, order)
+                    if key < best_key:
+                        best = u
+                        best_key = key
+
+            # Anything in a further ring is at least ring * cell_size away
+            reach = ring * self.cell_size
+            if best is not None and reach * reach > best_key[0]:
+                break
+
+        return best
+
+    def _ring_cells(self, cx, cy, ring):
+        # Cells at Chebyshev distance `ring`, clipped to the occupied bounds
+        min_x, min_y, max_x, max_y = self.bounds
+        if ring == 0:
+            yield (cx, cy)
+            return
+        x0 = max(cx - ring, min_x)
+        x1 = min(cx + ring, max_x)
+        for y in (cy - ring, cy + ring):
+            if min_y <= y <= max_y:
+                for x in range(x0, x1 + 1):
+                    yield (x, y)
+        y0 = max(cy - ring + 1, min_y)
+        y1 = min(cy + ring - 1, max_y)
+        for x in (cx - ring, cx + ring):
+            if min_x <= x <= max_x:
+                for y in range(y0, y1 + 1):
+                    yield (x, y)
+
+    def __len__(self):
+        return len(self.where)
@@ -0,0 +1,141 @@
+import json
+import os
+
+import numpy as np
+
+# Columnar battle traces.
+#
+# TraceRecorder captures position, hp and target of every unit at every step
+# into preallocated per-field buffers of `chunk_size` frames. Full chunks are
+# appended to one raw binary file per field, so memory stays bounded however
+# long the battle runs. close() writes meta.json next to them:
+#
+#   <path>/meta.json   - frame count, unit names and teams, dtypes
+#   <path>/time.bin    - float64 [frames]
+#   <path>/x.bin, y.bin - float32 [frames, units]
+#   <path>/hp.bin      - int32   [frames, units], 0 once dead
+#   <path>/target.bin  - int32   [frames, units], trace index of the target or -1
+#
+# TraceReader memory-maps those files, so scrubbing to any time only touches the
+# pages of that frame. Units are numbered team A first, then team B, in the
+# order they were added. A Battle without a recorder does no tracing work at all.
+
+FIELDS = {
+    'x': np.float32,
+    'y': np.float32,
+    'hp': np.int32,
+    'target': np.int32,
+}
+
+
+class TraceRecorder:
+    def __init__(self, path, chunk_size=1024):
+        self.path = path
+        self.chunk_size = chunk_size
+        self.units = []
+        self.index = {}      # Combatant -> trace index
+        self.frames = 0
+        self._filled = 0
+        self._files = {}
+
+    def start(self, battle):
+        self.units = list(battle.team_a) + list(battle.team_b)
+        self.teams = ['A'] * len(battle.team_a) + ['B'] * len(battle.team_b)
+        self.index = {u: i for i, u in enumerate(self.units)}
+        n = len(self.units)
+        self._time = np.zeros(self.chunk_size, dtype=np.float64)
+        self._buffers = {name: np.zeros((self.chunk_size, n), dtype=dtype) for name, dtype in FIELDS.items()}
+
+        os.makedirs(self.path, exist_ok=True)
+        self._files = {name: open(os.path.join(self.path, name + '.bin'), 'wb')
+                       for name in ('time',) + tuple(FIELDS)}
+        self.frames = 0
+        self._filled = 0
+        self.record_units(battle.time)
+
+    def record(self, time, x, y, hp, target):
+        # One frame from per-unit sequences in trace order
+        row = self._filled
+        self._time[row] = time
+        b = self._buffers
+        b['x'][row] = x
+        b['y'][row] = y
+        b['hp'][row] = hp
+        b['target'][row] = target
+        self._filled += 1
+        self.frames += 1
+        if self._filled == self.chunk_size:
+            self._flush()
+
+    def record_units(self, time):
+        # One frame read straight off the Combatant objects
+        units = self.units
+        index = self.index
+        self.record(time,
+                    [u.x for u in units],
+                    [u.y for u in units],
+                    [u.hp for u in units],
+                    [index.get(u.target, -1) for u in units])
+
+    def _flush(self):
+        n = self._filled
+        if not n:
+            return
+        self._time[:n].tofile(self._files['time'])
+        for name, buf in self._buffers.items():
+            buf[:n].tofile(self._files[name])
+        self._filled = 0
+
+    def close(self):
+        if not self._files:
+            return
+        self._flush()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+        meta = {
+            'frames': self.frames,
+            'units': len(self.units),
+            'names': [u.name for u in self.units],
+            'teams': self.teams,
+            'dtypes': {name: np.dtype(dtype).str for name, dtype in FIELDS.items()},
+        }
+        with open(os.path.join(self.path, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+
+class TraceReader:
+    def __init__(self, path):
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.names = self.meta['names']
+        self.teams = self.meta['teams']
+        frames = self.meta['frames']
+        units = self.meta['units']
+
+        def mapped(name, dtype, shape):
+            if not frames or (not units and len(shape) > 1):
+                return np.zeros(shape, dtype=dtype)
+            return np.memmap(os.path.join(path, name + '.bin'), dtype=dtype, mode='r', shape=shape)
+
+        self.times = mapped('time', np.float64, (frames,))
+        self.columns = {name: mapped(name, np.dtype(dtype), (frames, units))
+                        for name, dtype in self.meta['dtypes'].items()}
+
+    def __len__(self):
+        return len(self.times)
+
+    def frame_index(self, time):
+        # Last frame recorded at or before `time`
+        i = int(np.searchsorted(self.times, time, side='right')) - 1
+        return min(max(i, 0), len(self.times) - 1)
+
+    def at(self, time):
+        i = self.frame_index(time)
+        frame = {name: np.array(col[i]) for name, col in self.columns.items()}
+        frame['time'] = float(self.times[i])
+        return frame
+
+    def unit(self, i):
+        # Full history of one unit (memory-mapped column views)
+        return {name: col[:, i] for name, col in self.columns.items()}
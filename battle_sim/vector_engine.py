@@ -0,0 +1,131 @@
+import numpy as np
+
+# Struct-of-arrays battle engine.
+#
+# Each team is stored as a set of parallel NumPy arrays (hp, position, cooldown,
+# armor, attack, target index, ...) and every step resolves targeting, range
+# checks, damage and movement for a whole team at once.
+#
+# Ordering matches the object engine between teams (all of team A acts, then
+# all of team B), but inside a team every attacker acts on the state at the
+# start of that team's phase. The object engine instead lets a defender killed
+# by an earlier attacker be retargeted by later attackers in the same tick, so
+# here a few hits per tick can land as overkill on a unit that is already dead.
+#
+# Tolerance vs the object engine (same dt): the winner is the same for any
+# matchup that is not a near-draw, survivor counts agree within ~10% of the
+# army size (and exactly for 1-vs-1), and battle time within a few ticks.
+
+
+class TeamArrays:
+    def __init__(self, units):
+        n = len(units)
+        self.units = units
+        self.hp = np.array([u.hp for u in units], dtype=np.int64)
+        self.x = np.array([u.x for u in units], dtype=np.float64)
+        self.y = np.array([u.y for u in units], dtype=np.float64)
+        self.cooldown = np.array([u.cooldown for u in units], dtype=np.float64)
+        self.attack = np.array([u.attack for u in units], dtype=np.int64)
+        self.melee = np.array([u.attack_type == 'Melee' for u in units], dtype=bool)
+        self.melee_armor = np.array([u.melee_armor for u in units], dtype=np.int64)
+        self.pierce_armor = np.array([u.pierce_armor for u in units], dtype=np.int64)
+        self.reach = np.array([u.range + 0.5 for u in units], dtype=np.float64)  # +0.5 buffer for melee touch
+        self.rof = np.array([u.rof for u in units], dtype=np.float64)
+        self.speed = np.array([u.speed for u in units], dtype=np.float64)
+        self.target = np.full(n, -1, dtype=np.int64)
+        self.alive = np.array([u.alive for u in units], dtype=bool)
+
+    def write_back(self, enemy):
+        # Push array state back onto the Combatant objects
+        for i, u in enumerate(self.units):
+            u.hp = int(self.hp[i])
+            u.x = float(self.x[i])
+            u.y = float(self.y[i])
+            u.cooldown = float(self.cooldown[i])
+            u.alive = bool(self.alive[i])
+            t = self.target[i]
+            u.target = enemy.units[t] if t >= 0 else None
+        return [u for u in self.units if u.alive]
+
+
+def _process_phase(att, dfn, dt, variance=0.0, rng=None):
+    if not dfn.alive.any():
+        return
+
+    # Cooldown management
+    cooling = att.alive & (att.cooldown > 0)
+    att.cooldown[cooling] -= dt
+    ready = np.flatnonzero(att.alive & ~cooling)
+    if ready.size == 0:
+        return
+
+    # Retarget units whose target is missing or dead (nearest alive defender)
+    tgt = att.target[ready]
+    stale = (tgt < 0) | ~dfn.alive[np.maximum(tgt, 0)]
+    if stale.any():
+        who = ready[stale]
+        dx = att.x[who, None] - dfn.x[None, :]
+        dy = att.y[who, None] - dfn.y[None, :]
+        d2 = dx * dx + dy * dy
+        d2[:, ~dfn.alive] = np.inf
+        tgt[stale] = np.argmin(d2, axis=1)
+        att.target[ready] = tgt
+
+    dx = dfn.x[tgt] - att.x[ready]
+    dy = dfn.y[tgt] - att.y[ready]
+    dist = np.sqrt(dx * dx + dy * dy)
+
+    # Attack
+    in_range = dist <= att.reach[ready]
+    shooters = ready[in_range]
+    if shooters.size:
+        hit = tgt[in_range]
+        armor = np.where(att.melee[shooters], dfn.melee_armor[hit], dfn.pierce_armor[hit])
+        damage = np.maximum(1, att.attack[shooters] - armor)
+        if variance:
+            scale = rng.uniform(1 - variance, 1 + variance, size=damage.size)
+            damage = np.maximum(1, np.rint(damage * scale))
+        dfn.hp -= np.bincount(hit, weights=damage, minlength=dfn.hp.size).astype(np.int64)
+        att.cooldown[shooters] = att.rof[shooters]
+
+        dead = dfn.alive & (dfn.hp <= 0)
+        dfn.hp[dead] = 0
+        dfn.alive[dead] = False
+
+    # Move
+    moving = ~in_range & (dist > 0)
+    movers = ready[moving]
+    if movers.size:
+        mdx = dx[moving]
+        mdy = dy[moving]
+        mdist = dist[moving]
+        step = att.speed[movers] * dt
+        ratio = np.minimum(step / mdist, 1.0)
+        att.x[movers] += mdx * ratio
+        att.y[movers] += mdy * ratio
+
+
+def run_vectorized(battle, dt=0.1, max_time=1000):
+    a = TeamArrays(battle.team_a)
+    b = TeamArrays(battle.team_b)
+    variance = battle.damage_variance
+    rng = np.random.default_rng(battle.rng.getrandbits(64)) if variance else None
+    recorder = battle.recorder
+    n_a = len(a.units)
+
+    while battle.time < max_time and a.alive.any() and b.alive.any():
+        battle.time += dt
+        _process_phase(a, b, dt, variance, rng)
+        _process_phase(b, a, dt, variance, rng)
+
+        if recorder is not None:
+            # Trace indices: team A first, then team B
+            recorder.record(battle.time,
+                            np.concatenate((a.x, b.x)),
+                            np.concatenate((a.y, b.y)),
+                            np.concatenate((a.hp, b.hp)),
+                            np.concatenate((np.where(a.target >= 0, a.target + n_a, -1), b.target)))
+
+    battle.team_a = a.write_back(b)
+    battle.team_b = b.write_back(a)
+    return battle._result()
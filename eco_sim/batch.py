@@ -0,0 +1,203 @@
+import numpy as np
+
+from .catalog import RESOURCE_ORDER as RESOURCES, catalog_for
+from .entities import ResourceType
+from .executor import ActionType
+from .simulator import GATHER_RATE, DEFAULT_TRAIN_TIME
+from .start import START_BUILDINGS, START_NODES, START_RESOURCES, START_UNITS
+
+# Lockstep batch simulator.
+#
+# Runs N independent eco scenarios (one build order each) side by side. Every
+# piece of state has a leading scenario axis:
+#   resources  [N, 4]       banked Food / Wood / Gold / Stone
+#   nodes      [N, nodes]   amount left on each resource node
+#   queue      [N, buildings] unit in production (-1 idle) and time remaining
+#   slots      [N, units]   one column per unit in spawn order: its kind,
+#                           target node (-1 idle) and held amount
+#   cursor     [N]          each scenario's position in its build order
+# so a tick costs a fixed number of array operations however many scenarios
+# there are. Python loops only run over buildings, nodes and unit slots.
+#
+# Every scenario starts from the same setup as Fitness.evaluate (start.py), follows the
+# same Executor rules (one step per tick, lowest idle building / villager
+# first) and the same per-tick order as Simulator.tick (buildings, then units
+# in spawn order), so scores come out identical to one Fitness.evaluate per
+# genome. Targets are unit counts ({unit name: count}) rather than arbitrary
+# callables, which is what makes them checkable for the whole batch at once.
+
+MAX_CARRY = 10
+
+IDLE = -1
+NOOP, TRAIN, GATHER = 0, 1, 2
+
+
+class BatchSimulator:
+    def __init__(self, unit_data, buildings=START_BUILDINGS, nodes=START_NODES,
+                 units=START_UNITS, resources=None):
+        # unit_data: the scraped unit list, as for Simulator.load_unit_data
+        self.catalog = catalog_for(unit_data)
+        self.buildings = list(buildings)
+        self.nodes = list(nodes)
+        self.start_units = list(units)
+        self.start_resources = resources or START_RESOURCES
+
+    def _unit_table(self, names):
+        # Per unit kind: cost vector, train time, whether it can be trained at
+        # all, villager flag
+        cost = np.zeros((len(names), len(RESOURCES)))
+        train_time = np.full(len(names), DEFAULT_TRAIN_TIME)
+        trainable = np.zeros(len(names), dtype=bool)
+        for i, name in enumerate(names):
+            if name in self.catalog:
+                trainable[i] = True
+                cost[i] = self.catalog.cost_vector(name)
+                train_time[i] = self.catalog.train_time(name, DEFAULT_TRAIN_TIME)
+        villager = np.array([name.startswith("Villager") for name in names], dtype=bool)
+        return cost, train_time, trainable, villager
+
+    def _encode(self, orders, names):
+        # Build orders -> [N, L] arrays of action kind and arguments
+        n = len(orders)
+        length = max((len(o) for o in orders), default=0)
+        kind = np.zeros((n, length + 1), dtype=np.int64)  # trailing NOOP column
+        unit = np.zeros((n, length + 1), dtype=np.int64)
+        where = np.full((n, length + 1), -1, dtype=np.int64)  # building name / node index
+        building_names = list(dict.fromkeys(self.buildings))
+        node_index = {}
+        for i, (name, _, _) in enumerate(self.nodes):
+            node_index.setdefault(name, i)
+
+        for s, order in enumerate(orders):
+            for k, (action, target, param) in enumerate(order):
+                if action == ActionType.TRAIN:
+                    kind[s, k] = TRAIN
+                    if target not in names:
+                        names[target] = len(names)
+                    unit[s, k] = names[target]
+                    where[s, k] = building_names.index(param) if param in building_names else -1
+                elif action == ActionType.GATHER:
+                    kind[s, k] = GATHER
+                    where[s, k] = node_index.get(param, -1)
+                else:
+                    # The Executor has no handler for it, so the order stalls here
+                    kind[s, k] = NOOP
+                    where[s, k] = -2
+        lengths = np.array([len(o) for o in orders], dtype=np.int64)
+        btype = np.array([building_names.index(b) for b in self.buildings], dtype=np.int64)
+        return kind, unit, where, lengths, btype
+
+    def run(self, orders, target, max_time=600, dt=1.0):
+        # orders: one build order (list of (ActionType, target, param)) per scenario
+        # target: {unit name: count}, reached when every count is met
+        # Returns a dict of per-scenario arrays: score, completed, time, units, resources
+        names = {}
+        for name in self.start_units:
+            names.setdefault(name, len(names))
+        for name in target:
+            names.setdefault(name, len(names))
+        kind, act_unit, act_where, lengths, btype = self._encode(orders, names)
+        cost, train_time, trainable, villager = self._unit_table(list(names))
+
+        n = len(orders)
+        rows = np.arange(n)
+        n_slots = len(self.start_units) + int((kind == TRAIN).sum(axis=1).max(initial=0))
+        n_buildings = len(self.buildings)
+        share = GATHER_RATE * dt
+
+        resources = np.tile(np.array([float(self.start_resources.get(r, 0)) for r in RESOURCES]), (n, 1))
+        node_amount = np.tile(np.array([float(a) for _, _, a in self.nodes]), (n, 1))
+        node_res = np.array([RESOURCES.index(r) for _, r, _ in self.nodes], dtype=np.int64)
+        queue_unit = np.full((n, n_buildings), -1, dtype=np.int64)
+        queue_time = np.zeros((n, n_buildings))
+        slot_kind = np.full((n, n_slots), -1, dtype=np.int64)
+        slot_node = np.full((n, n_slots), IDLE, dtype=np.int64)
+        held = np.zeros((n, n_slots))
+        for i, name in enumerate(self.start_units):
+            slot_kind[:, i] = names[name]
+        n_units = np.full(n, len(self.start_units), dtype=np.int64)
+        counts = np.zeros((n, len(names)), dtype=np.int64)
+        for name in self.start_units:
+            counts[:, names[name]] += 1
+        cursor = np.zeros(n, dtype=np.int64)
+        time = np.zeros(n)
+
+        target_units = np.array([names[name] for name in target], dtype=np.int64)
+        target_counts = np.array(list(target.values()), dtype=np.int64)
+        completed = np.zeros(n, dtype=bool)
+        active = np.ones(n, dtype=bool)
+
+        for _ in range(max_time):
+            if not active.any():
+                break
+
+            # Executor: one build-order step per scenario
+            step = np.minimum(cursor, lengths)
+            step_kind = np.where(active & (cursor < lengths), kind[rows, step], NOOP)
+            unit = act_unit[rows, step]
+            where = act_where[rows, step]
+
+            train = step_kind == TRAIN
+            if train.any():
+                building = np.full(n, -1, dtype=np.int64)
+                for b in range(n_buildings):
+                    free = train & (building < 0) & (btype[b] == where) & (queue_unit[:, b] < 0)
+                    building[free] = b
+                afford = trainable[unit] & (resources >= cost[unit]).all(axis=1)
+                go = np.flatnonzero(train & (building >= 0) & afford)
+                resources[go] -= cost[unit[go]]
+                queue_unit[go, building[go]] = unit[go]
+                queue_time[go, building[go]] = train_time[unit[go]]
+                cursor[go] += 1
+
+            gather = (step_kind == GATHER) & (where >= 0)
+            if gather.any():
+                idle = (slot_node == IDLE) & (slot_kind >= 0) & villager[np.maximum(slot_kind, 0)]
+                first = np.argmax(idle, axis=1)
+                go = np.flatnonzero(gather & idle.any(axis=1))
+                slot_node[go, first[go]] = where[go]
+                cursor[go] += 1
+
+            # Simulator.tick: buildings first, then units in spawn order
+            time[active] += dt
+            for b in range(n_buildings):
+                busy = np.flatnonzero(active & (queue_unit[:, b] >= 0))
+                if not busy.size:
+                    continue
+                queue_time[busy, b] -= dt
+                done = busy[queue_time[busy, b] <= 0]
+                spawned = queue_unit[done, b]
+                slot_kind[done, n_units[done]] = spawned
+                np.add.at(counts, (done, spawned), 1)
+                n_units[done] += 1
+                queue_unit[done, b] = -1
+
+            for v in range(n_slots):
+                g = np.flatnonzero(active & (slot_node[:, v] >= 0))
+                if not g.size:
+                    continue
+                node = slot_node[g, v]
+                amount = node_amount[g, node]
+                g, node, amount = g[amount > 0], node[amount > 0], amount[amount > 0]
+                taken = np.minimum(share, amount)
+                node_amount[g, node] = amount - taken
+                held[g, v] += taken
+                drop = held[g, v] >= MAX_CARRY
+                g, node = g[drop], node[drop]
+                resources[g, node_res[node]] += held[g, v]
+                held[g, v] = 0.0
+
+            reached = active & (counts[:, target_units] >= target_counts).all(axis=1)
+            completed |= reached
+            active &= ~reached
+
+        entities = n_buildings + len(self.nodes) + n_units
+        score = np.where(completed, 10000 - time,
+                         resources[:, RESOURCES.index(ResourceType.FOOD)] + entities * 100)
+        return {
+            'score': score,
+            'completed': completed,
+            'time': time,
+            'units': {name: counts[:, i] for name, i in names.items()},
+            'resources': {r: resources[:, i] for i, r in enumerate(RESOURCES)},
+        }
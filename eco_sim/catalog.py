@@ -0,0 +1,192 @@
+import hashlib
+import json
+import os
+import re
+from collections import OrderedDict
+
+import numpy as np
+
+from .entities import ResourceType
+
+# Precompiled unit catalog.
+#
+# The scraped units.json keeps costs as {"Food": 50} string maps and the
+# training time, producing building and age only inside the free-text
+# description ("Training time\n35 seconds"). compile() turns each unit into one
+# row of a structured array:
+#   name        unit name
+#   cost        float64[4], indexed by ResourceType (FOOD, WOOD, GOLD, STONE)
+#   train_time  seconds, base value when several are listed; NaN if unknown
+#   building    producing building ("Trained at"), '' if unknown
+#   age         age it becomes available, '' if unknown
+#
+# load() caches the array as <units>.catalog.npz next to the JSON, together
+# with a hash of the unit list, and only recompiles when that hash changes.
+# catalog_for() goes through it, so every Simulator, BatchSimulator and
+# Fitness built from the contents of data/units.json reuses the binary file.
+
+DEFAULT_UNITS_PATH = os.path.join("data", "units.json")
+
+RESOURCE_ORDER = (ResourceType.FOOD, ResourceType.WOOD, ResourceType.GOLD, ResourceType.STONE)
+COST_KEYS = {"Food": ResourceType.FOOD, "Wood": ResourceType.WOOD,
+             "Gold": ResourceType.GOLD, "Stone": ResourceType.STONE}
+
+RECORD_DTYPE = np.dtype([
+    ('name', 'U64'),
+    ('cost', np.float64, (len(RESOURCE_ORDER),)),
+    ('train_time', np.float64),
+    ('building', 'U32'),
+    ('age', 'U16'),
+])
+
+_TRAIN_TIME = re.compile(r'Training time\s*\n\s*(\d+(?:\.\d+)?)')
+_BUILDING = re.compile(r'Trained at\s*\n\s*([^\n]+)')
+_AGE = re.compile(r'\nAge\s*\n\s*([^\n]+)')
+
+
+def _field(pattern, text):
+    m = pattern.search(text)
+    return m.group(1).strip().rstrip('*') if m else ''
+
+
+def units_hash(units_list):
+    # Content hash of a unit list, independent of key order and file layout
+    return hashlib.sha256(json.dumps(units_list, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _read_units(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def cache_path(units_path):
+    return os.path.splitext(units_path)[0] + '.catalog.npz'
+
+
+class UnitCatalog:
+    def __init__(self, records, units=None):
+        self.records = records
+        self.units = units or {}  # name -> raw unit dict, for stats
+        self.index = {str(name): i for i, name in enumerate(records['name'])}
+        # Per unit: (ResourceType, amount) for every resource it actually costs
+        self._costs = {}
+        for name, i in self.index.items():
+            cost = records['cost'][i]
+            self._costs[name] = tuple((res, float(cost[k])) for k, res in enumerate(RESOURCE_ORDER) if cost[k])
+
+    @classmethod
+    def compile(cls, units_list):
+        records = np.zeros(len(units_list), dtype=RECORD_DTYPE)
+        for i, u in enumerate(units_list):
+            desc = u.get('description', '')
+            records[i]['name'] = u['name']
+            for res_str, amount in u.get('costs', {}).items():
+                if res_str in COST_KEYS:
+                    records[i]['cost'][RESOURCE_ORDER.index(COST_KEYS[res_str])] = amount
+            m = _TRAIN_TIME.search(desc)
+            records[i]['train_time'] = float(m.group(1)) if m else np.nan
+            records[i]['building'] = _field(_BUILDING, desc)
+            records[i]['age'] = _field(_AGE, desc)
+        return cls(records, {u['name']: u for u in units_list})
+
+    @classmethod
+    def load(cls, units_path=DEFAULT_UNITS_PATH, units_list=None, source_hash=None):
+        # Compiled records from the binary cache next to units_path, recompiled
+        # if the units changed. units_list: the units to compile, default the
+        # JSON's contents; the cache is only rewritten when they are the JSON's
+        # contents, so an edited list in memory never replaces it.
+        from_file = units_list is None
+        if from_file:
+            units_list = _read_units(units_path)
+        if source_hash is None:
+            source_hash = units_hash(units_list)
+        units = {u['name']: u for u in units_list}
+
+        path = cache_path(units_path)
+        try:
+            with np.load(path) as cached:
+                if str(cached['source_hash']) == source_hash and cached['records'].dtype == RECORD_DTYPE:
+                    return cls(cached['records'], units)
+        except (OSError, KeyError, ValueError):
+            pass
+
+        catalog = cls.compile(units_list)
+        if not from_file:
+            try:
+                from_file = units_hash(_read_units(units_path)) == source_hash
+            except (OSError, ValueError):
+                from_file = False
+        if from_file:
+            tmp = path + '.tmp'
+            try:
+                with open(tmp, 'wb') as f:
+                    np.savez(f, records=catalog.records, source_hash=np.array(source_hash))
+                os.replace(tmp, path)
+            except OSError:
+                pass  # read-only checkout: keep the compiled catalog in memory
+        return catalog
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, name):
+        i = self.index.get(name)
+        return self.records[i] if i is not None else None
+
+    def cost_vector(self, name):
+        i = self.index.get(name)
+        return self.records['cost'][i] if i is not None else None
+
+    def costs(self, name):
+        # ((ResourceType, amount), ...) or None for an unknown unit
+        return self._costs.get(name)
+
+    def train_time(self, name, default=None):
+        i = self.index.get(name)
+        if i is None or np.isnan(self.records['train_time'][i]):
+            return default
+        return float(self.records['train_time'][i])
+
+    def can_afford(self, resources, name):
+        # resources: {ResourceType: amount}, as in GameState
+        costs = self._costs.get(name)
+        if costs is None:
+            return False
+        return all(resources.get(res, 0) >= amount for res, amount in costs)
+
+
+# Both caches are small LRUs, so long runs that build many lists stay bounded
+_hashes = OrderedDict()  # id(units list) -> (units list, content hash)
+_compiled = OrderedDict()  # content hash -> UnitCatalog
+MAX_HASHED = 16
+MAX_COMPILED = 8
+
+
+def _remember(cache, key, value, limit):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+def catalog_for(units_list, units_path=DEFAULT_UNITS_PATH):
+    # One UnitCatalog per distinct unit list contents. Fitness hands the same
+    # list object to every Simulator it creates, so the content hash is only
+    # computed once per list object.
+    entry = _hashes.get(id(units_list))
+    if entry is None or entry[0] is not units_list:
+        entry = (units_list, units_hash(units_list))
+    _remember(_hashes, id(units_list), entry, MAX_HASHED)
+
+    source_hash = entry[1]
+    catalog = _compiled.get(source_hash)
+    if catalog is None:
+        if os.path.exists(units_path):
+            catalog = UnitCatalog.load(units_path, units_list, source_hash)
+        else:
+            catalog = UnitCatalog.compile(units_list)
+    _remember(_compiled, source_hash, catalog, MAX_COMPILED)
+    return catalog
@@ -6,11 +6,10 @@ class EntityType(Enum):
     RESOURCE = auto()
 
 class Entity:
-    _id_counter = 0
+    __slots__ = ('id', 'name', 'entity_type')
 
     def __init__(self, name, entity_type):
-        self.id = Entity._id_counter
-        Entity._id_counter += 1
+        self.id = None # Assigned by GameState.add_entity
         self.name = name
         self.entity_type = entity_type
 
@@ -21,10 +20,20 @@ class UnitState(Enum):
     BUILDING = auto()
     ATTACKING = auto()
 
+# Units, buildings and nodes are __slots__ classes so EntityPool can recycle
+# them: reset() puts a used instance back into its freshly constructed state.
+
 class Unit(Entity):
+    __slots__ = ('_owner', '_state', 'stats', 'target', 'gather_type',
+                 'held_resource', 'max_carry', 'gather_rate')
+
     def __init__(self, name, stats=None):
-        super().__init__(name, EntityType.UNIT)
-        self.state = UnitState.IDLE
+        self.reset(name, stats)
+
+    def reset(self, name, stats=None):
+        Entity.__init__(self, name, EntityType.UNIT)
+        self._owner = None # GameState indexing this unit
+        self._state = UnitState.IDLE
         self.stats = stats or {}
         self.target = None
         self.gather_type = None
@@ -32,9 +41,25 @@ class Unit(Entity):
         self.max_carry = 10  # Default, can be upgraded
         self.gather_rate = 0.5 # Default specific to resource usually
 
+    @property
+    def state(self):
+        return self._state
+
+    @state.setter
+    def state(self, value):
+        old = self._state
+        self._state = value
+        if self._owner is not None and old != value:
+            self._owner.unit_state_changed(self, old)
+
 class Building(Entity):
+    __slots__ = ('stats', 'production_queue', 'progress')
+
     def __init__(self, name, stats=None):
-        super().__init__(name, EntityType.BUILDING)
+        self.reset(name, stats)
+
+    def reset(self, name, stats=None):
+        Entity.__init__(self, name, EntityType.BUILDING)
         self.stats = stats or {}
         self.production_queue = [] # List of (UnitName, TimeRemaining)
         self.progress = 0 # Construction progress if being built
@@ -46,8 +71,13 @@ class ResourceType(Enum):
     STONE = auto()
 
 class ResourceNode(Entity):
+    __slots__ = ('resource_type', 'amount')
+
     def __init__(self, name, resource_type, amount):
-        super().__init__(name, EntityType.RESOURCE)
+        self.reset(name, resource_type, amount)
+
+    def reset(self, name, resource_type, amount):
+        Entity.__init__(self, name, EntityType.RESOURCE)
         self.resource_type = resource_type
         self.amount = amount
 
@@ -0,0 +1,98 @@
+import json
+from collections import deque, namedtuple
+
+# Event sinks for Simulator, Executor and Battle.
+#
+# Instead of printing, the simulators emit typed events:
+#   Event(time, kind, entity, payload)
+# time is the simulation time, kind a short string ('spawn', 'queue',
+# 'cannot_afford', 'execute', 'kill', ...), entity the id or label of the
+# entity it is about and payload a small dict.
+#
+# A sink is anything with `enabled` and `emit(time, kind, entity, payload)`.
+# Simulators drop sinks with enabled = False at construction, so with the
+# NullSink (the default) an event costs one `is not None` check and nothing is
+# formatted.
+
+Event = namedtuple('Event', 'time kind entity payload')
+
+
+class NullSink:
+    enabled = False
+
+    def emit(self, time, kind, entity, payload=None):
+        pass
+
+    def close(self):
+        pass
+
+
+class RingBufferSink:
+    # Keeps the last `size` events in memory for debugging
+    enabled = True
+
+    def __init__(self, size=1000):
+        self.events = deque(maxlen=size)
+
+    def emit(self, time, kind, entity, payload=None):
+        self.events.append(Event(time, kind, entity, payload))
+
+    def __iter__(self):
+        return iter(self.events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def close(self):
+        pass
+
+
+class JsonlSink:
+    # Streams one JSON object per line to `path` (or an open text file)
+    enabled = True
+
+    def __init__(self, path):
+        self._owned = isinstance(path, str)
+        self.file = open(path, 'w', encoding='utf-8') if self._owned else path
+
+    def emit(self, time, kind, entity, payload=None):
+        self.file.write(json.dumps({'time': time, 'kind': kind, 'entity': entity, 'payload': payload},
+                                   default=str))
+        self.file.write('\n')
+
+    def close(self):
+        if self._owned and not self.file.closed:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class PrintSink:
+    # The old console messages, for the verify scripts and interactive runs
+    enabled = True
+
+    FORMATS = {
+        'spawn': "Time {time:.1f}: Created {unit}",
+        'queue': "Time {time:.1f}: Queued {unit} at {building}",
+        'cannot_afford': "Time {time:.1f}: Cannot afford {unit}",
+        'execute': "Executing: {action} {target}",
+    }
+
+    def emit(self, time, kind, entity, payload=None):
+        fmt = self.FORMATS.get(kind)
+        if fmt is None:
+            print(f"Time {time:.1f}: {kind} {entity} {payload or ''}")
+        else:
+            print(fmt.format(time=time, **(payload or {})))
+
+    def close(self):
+        pass
+
+
+def active_sink(sink):
+    # None for sinks that would do nothing, so call sites can skip them
+    return sink if sink is not None and sink.enabled else None
@@ -16,8 +16,9 @@ class Executor:
         self.current_step = 0
 
     def update(self):
+        # Returns True if a build order step was executed
         if self.current_step >= len(self.build_order):
-            return
+            return False
 
         action, target, param = self.build_order[self.current_step]
 
@@ -28,21 +29,14 @@ class Executor:
             building_type = param
             
             # Find an idle building of this type
-            # We need a helper in sim to find idle buildings?
-            # Or we iterate here.
-            candidates = [
-                e for e in self.sim.state.entities 
-                if e.entity_type == EntityType.BUILDING 
-                and e.name == building_type
-                and not e.production_queue
-            ]
+            building = self.sim.state.idle_building(building_type)
             
-            if candidates:
-                building = candidates[0]
+            if building:
                 if self.sim.can_afford_unit(target):
                     self.sim.train_unit(building.id, target)
-                    print(f"Executing: TRAIN {target}")
+                    self._report(action, target)
                     self.current_step += 1
+                    return True
                 else:
                     # Waiting for resources
                     pass
@@ -59,19 +53,21 @@ class Executor:
             # This logic is tricky. Usually "Gather" is a setting for new villagers or re-tasking.
             # Let's assume the step means "Retask 1 idle villager to X"
             
-            idle_villagers = [
-                u for u in self.sim.state.entities
-                if u.entity_type == EntityType.UNIT
-                and u.name.startswith("Villager") # heuristic
-                and u.state == UnitState.IDLE
-            ]
+            villager = self.sim.state.idle_unit("Villager") # heuristic
             
-            if idle_villagers:
-                villager = idle_villagers[0]
+            if villager:
                 # Find resource node
-                res_node = next((r for r in self.sim.state.entities if r.entity_type == EntityType.RESOURCE and r.name == param), None)
+                res_node = self.sim.state.find(EntityType.RESOURCE, param)
                 if res_node:
                     villager.state = UnitState.GATHERING
                     villager.target = res_node
-                    print(f"Executing: GATHER {param}")
+                    self._report(action, param)
                     self.current_step += 1
+                    return True
+        return False
+
+    def _report(self, action, target):
+        events = self.sim.events
+        if events is not None:
+            events.emit(self.sim.state.time, 'execute', self.current_step,
+                        {'action': action, 'target': target})
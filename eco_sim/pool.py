@@ -0,0 +1,55 @@
+from .entities import Unit, Building, ResourceNode
+
+# Per-simulation entity pools.
+#
+# A long optimizer run creates and drops thousands of Simulators, each with
+# its own units, buildings and nodes. An EntityPool keeps the entities of
+# finished simulations on free lists and hands them out again, reset to a
+# freshly constructed state, instead of allocating new objects.
+#
+# Only release entities once nothing refers to them any more: GameState.release()
+# is called by Fitness after the score is computed. A pool is not thread-safe;
+# give each thread (or Fitness) its own.
+
+
+class EntityPool:
+    def __init__(self):
+        self._free = {Unit: [], Building: [], ResourceNode: []}
+        self.allocated = 0  # objects created because the free list was empty
+        self.reused = 0
+
+    def _take(self, cls):
+        # A recycled instance to re-initialise, or a new uninitialised one
+        free = self._free[cls]
+        if free:
+            self.reused += 1
+            return free.pop()
+        self.allocated += 1
+        return cls.__new__(cls)
+
+    def unit(self, name, stats=None):
+        u = self._take(Unit)
+        u.reset(name, stats)
+        return u
+
+    def building(self, name, stats=None):
+        b = self._take(Building)
+        b.reset(name, stats)
+        return b
+
+    def resource(self, name, resource_type, amount):
+        r = self._take(ResourceNode)
+        r.reset(name, resource_type, amount)
+        return r
+
+    def release(self, entities):
+        for e in entities:
+            # Drop references so recycled entities keep nothing alive
+            if isinstance(e, Unit):
+                e._owner = None
+                e.target = None
+                e.stats = None
+            elif isinstance(e, Building):
+                e.production_queue = None
+                e.stats = None
+            self._free[type(e)].append(e)
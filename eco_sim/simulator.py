@@ -1,18 +1,86 @@
+import math
+
 from .state import GameState
-from .entities import Unit, Building, UnitState, ResourceType, EntityType
+from .executor import Executor
+from .catalog import UnitCatalog, catalog_for
+from .events import active_sink
+from .entities import UnitState, EntityType
+
+# Villager default gather rate is roughly ~0.4-0.5 per sec depending on resource.
+GATHER_RATE = 0.4
+# Used for units whose description has no training time
+DEFAULT_TRAIN_TIME = 20.0
+
+ECONOMIES = ('object', 'numpy')
 
 class Simulator:
-    def __init__(self):
-        self.state = GameState()
-        self.unit_data = {} # To hold the scraped data
+    def __init__(self, economy='object', events=None, pool=None):
+        # economy: 'object' updates each villager in Python,
+        #          'numpy' resolves all gatherers in batched array operations
+        #          (see worker_pool.py), with identical results.
+        # events: sink for spawn / queue / execute events (see events.py),
+        #         nothing is reported by default
+        # pool: EntityPool to allocate entities from (see pool.py), shared
+        #       between simulations that run one after another
+        if economy not in ECONOMIES:
+            raise ValueError(f"Unknown economy: {economy}")
+        self.state = GameState(pool)
+        self.catalog = UnitCatalog.compile([])
+        self.unit_data = self.catalog.units # To hold the scraped data
+        self.economy = economy
+        self.events = active_sink(events)
+        self._workers = None
 
     def load_unit_data(self, units_list):
-        # Convert list of dicts to a dict by name for easy lookup
-        for u in units_list:
-            self.unit_data[u['name']] = u
+        # Compile the scraped list into a UnitCatalog (costs, train times);
+        # unit_data stays a dict by name for easy lookup
+        if self.unit_data:
+            merged = dict(self.unit_data)
+            merged.update((u['name'], u) for u in units_list)
+            units_list = list(merged.values())
+        self.catalog = catalog_for(units_list)
+        self.unit_data = self.catalog.units
+
+    def snapshot(self, executor=None):
+        # Immutable record of the simulation, the executor's place in its build
+        # order and the next entity id. The unit catalog is shared, not copied.
+        self._sync_workers()
+        order = tuple(executor.build_order) if executor is not None else None
+        step = executor.current_step if executor is not None else 0
+        return (self.state.snapshot(), self.state.next_id, self.catalog, order, step)
+
+    @classmethod
+    def from_snapshot(cls, snap, build_order=None, economy='object', pool=None):
+        # Returns (simulator, executor); executor is None if the snapshot had none.
+        # build_order replaces the executor's order, keeping its step position,
+        # so a continuation is passed as done_steps + new_steps.
+        state, next_id, catalog, order, step = snap
+        sim = cls(economy, pool=pool)
+        sim.state = GameState.from_snapshot(state, sim.state.pool)
+        sim.state.next_id = next_id
+        sim.catalog = catalog
+        sim.unit_data = catalog.units
+
+        executor = None
+        if build_order is not None or order is not None:
+            executor = Executor(sim)
+            executor.load_order(list(build_order if build_order is not None else order))
+            executor.current_step = step
+        return sim, executor
+
+    def fork(self, executor=None, build_order=None):
+        # Independent copy of this simulation (and executor) to branch from
+        return Simulator.from_snapshot(self.snapshot(executor), build_order, self.economy, self.state.pool)
 
     def tick(self, dt=1.0):
         self.state.time += dt
+
+        if self.economy == 'numpy':
+            # Villagers are handled by the worker pool; units in any other state do nothing
+            self._worker_pool().step(dt)
+            for building in list(self.state.buildings.values()):
+                self._update_building(building, dt)
+            return
         
         # Update entities
         for entity in self.state.entities:
@@ -26,9 +94,7 @@ class Simulator:
             if unit.target and unit.target.entity_type == EntityType.RESOURCE:
                 # Gather logic
                 # Rate depends on type. Simple heuristic for now.
-                # Villager default gather rate is roughly ~0.4-0.5 per sec depending on resource.
-                rate = 0.4 
-                amount = rate * dt
+                amount = GATHER_RATE * dt
                 
                 # Check if node has enough
                 if unit.target.amount > 0:
@@ -41,6 +107,75 @@ class Simulator:
                         self.state.add_resource(unit.target.resource_type, unit.held_resource)
                         unit.held_resource = 0
 
+    def advance(self, max_ticks, dt=1.0):
+        # Event-driven stepping: jump straight to the next tick where something
+        # discrete happens (a drop-off, a production completing, a resource node
+        # running dry) and return how many ticks were covered. The ticks before
+        # it are applied in bulk; the event tick itself is a normal tick().
+        # Only valid while the executor is blocked: nothing it waits on
+        # (resources, idle buildings or villagers) changes between events.
+        if self._workers is not None:
+            # Bulk ticks work on the Unit objects; the worker pool reloads afterwards
+            self._workers.release()
+        ticks = self._ticks_to_next_event(dt, max_ticks)
+        if ticks > 1:
+            self._bulk_ticks(ticks - 1, dt)
+        self.tick(dt)
+        return ticks
+
+    def _worker_pool(self):
+        if self._workers is None or self._workers.state is not self.state:
+            from .worker_pool import WorkerPool
+            self._workers = WorkerPool(self.state, GATHER_RATE)
+        return self._workers
+
+    def _sync_workers(self):
+        # Bring Unit.held_resource up to date with the worker arrays
+        if self._workers is not None:
+            self._workers.sync()
+
+    def _gatherers(self):
+        # Villagers actually taking resources this tick, grouped by node
+        by_node = {}
+        for unit in self.state.by_state[UnitState.GATHERING].values():
+            if (unit.target and unit.target.entity_type == EntityType.RESOURCE
+                    and unit.target.amount > 0):
+                by_node.setdefault(unit.target, []).append(unit)
+        return by_node
+
+    def _ticks_to_next_event(self, dt, limit):
+        ticks = limit
+        step = GATHER_RATE * dt
+
+        # Production completing
+        for e in self.state.entities:
+            if e.entity_type == EntityType.BUILDING and e.production_queue:
+                needed = e.production_queue[0][1]
+                ticks = min(ticks, max(1, math.ceil(needed / dt - 1e-9)))
+
+        for node, units in self._gatherers().items():
+            # Node running dry: every gatherer gets a full `step` for this many ticks
+            full = math.floor(node.amount / (len(units) * step) - 1e-9)
+            ticks = min(ticks, full + 1)
+            # Drop-offs
+            for u in units:
+                ticks = min(ticks, max(1, math.ceil((u.max_carry - u.held_resource) / step - 1e-9)))
+
+        return max(1, ticks)
+
+    def _bulk_ticks(self, n, dt):
+        # n ticks in which no drop-off, spawn or depletion happens
+        self.state.time += n * dt
+        amount = GATHER_RATE * dt * n
+        for node, units in self._gatherers().items():
+            for u in units:
+                node.amount -= amount
+                u.held_resource += amount
+        for e in self.state.entities:
+            if e.entity_type == EntityType.BUILDING and e.production_queue:
+                unit_name, needed_time = e.production_queue[0]
+                e.production_queue[0] = (unit_name, needed_time - n * dt)
+
     def _update_building(self, building, dt):
         if building.production_queue:
             # item is (UnitName, TimeRemaining)
@@ -51,71 +186,43 @@ class Simulator:
                 # Unit complete
                 self._spawn_unit(unit_name)
                 building.production_queue.pop(0)
+                self.state.building_changed(building)
             else:
                 building.production_queue[0] = (unit_name, needed_time)
 
     def _spawn_unit(self, unit_name):
         # Look up stats
         stats = self.unit_data.get(unit_name, {}).get('stats', {})
-        new_unit = Unit(unit_name, stats=stats)
+        new_unit = self.state.pool.unit(unit_name, stats=stats)
         self.state.add_entity(new_unit)
-        print(f"Time {self.state.time:.1f}: Created {unit_name}")
+        if self.events is not None:
+            self.events.emit(self.state.time, 'spawn', new_unit.id, {'unit': unit_name})
 
     def train_unit(self, building_id, unit_name):
         # Find building
-        building = next((e for e in self.state.entities if e.id == building_id), None)
+        building = self.state.get(building_id)
         if building and building.entity_type == EntityType.BUILDING:
             # Check costs
             if self._pay_cost(unit_name):
-                # Get build time. Scraped data might have "Training time" in a weird format string
-                # HEURISTIC: "20 seconds"
-                train_time = 20.0 # Default
-                # TODO: Parse from scraped data properly
+                train_time = self.catalog.train_time(unit_name, DEFAULT_TRAIN_TIME)
                 
                 building.production_queue.append((unit_name, train_time))
-                print(f"Time {self.state.time:.1f}: Queued {unit_name} at {building.name}")
-            else:
-                print(f"Time {self.state.time:.1f}: Cannot afford {unit_name}")
+                self.state.building_changed(building)
+                if self.events is not None:
+                    self.events.emit(self.state.time, 'queue', building.id,
+                                     {'unit': unit_name, 'building': building.name, 'train_time': train_time})
+            elif self.events is not None:
+                self.events.emit(self.state.time, 'cannot_afford', building.id, {'unit': unit_name})
 
     def can_afford_unit(self, unit_name):
-        data = self.unit_data.get(unit_name)
-        if not data: 
-            return False
-            
-        costs = data.get('costs', {})
-        # Map string keys to Enum
-        cost_map = {
-            "Food": ResourceType.FOOD,
-            "Wood": ResourceType.WOOD,
-            "Gold": ResourceType.GOLD,
-            "Stone": ResourceType.STONE
-        }
-        
-        for res_str, amount in costs.items():
-            res_type = cost_map.get(res_str)
-            if res_type:
-                if self.state.get_resource(res_type) < amount:
-                    return False
-        return True
+        return self.catalog.can_afford(self.state.resources, unit_name)
 
     def _pay_cost(self, unit_name):
         if not self.can_afford_unit(unit_name):
             return False
             
-        data = self.unit_data.get(unit_name)
-        costs = data.get('costs', {})
-        cost_map = {
-            "Food": ResourceType.FOOD,
-            "Wood": ResourceType.WOOD,
-            "Gold": ResourceType.GOLD,
-            "Stone": ResourceType.STONE
-        }
-        
         # Deduct
-        for res_str, amount in costs.items():
-            res_type = cost_map.get(res_str)
-            if res_type:
-                self.state.add_resource(res_type, -amount)
+        for res_type, amount in self.catalog.costs(unit_name):
+            self.state.add_resource(res_type, -amount)
         
         return True
-
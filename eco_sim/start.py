@@ -0,0 +1,28 @@
+from .entities import ResourceType
+
+# Standard start used to score build orders.
+#
+# Fitness, BatchSimulator and the static feasibility pass all start from
+# these constants, so scores, batch results and pruning bounds agree.
+# Entities are added in this order (buildings, nodes, then units), which
+# fixes their ids.
+
+START_RESOURCES = {ResourceType.FOOD: 200, ResourceType.WOOD: 200, ResourceType.GOLD: 0, ResourceType.STONE: 150}
+START_BUILDINGS = ("Town Center",)
+START_NODES = (("Berry Bush", ResourceType.FOOD, 2000),)
+START_UNITS = ("Villager (Age of Empires)",) * 3
+START_MAX_POPULATION = 5
+
+
+def setup(sim):
+    # Put a fresh Simulator (unit data loaded) into the standard start
+    state = sim.state
+    for name in START_BUILDINGS:
+        state.add_entity(state.pool.building(name))
+    for name, resource_type, amount in START_NODES:
+        state.add_entity(state.pool.resource(name, resource_type, amount))
+    state.resources = dict(START_RESOURCES)
+    state.population = 0
+    state.max_population = START_MAX_POPULATION
+    for name in START_UNITS:
+        sim._spawn_unit(name)
@@ -1,7 +1,45 @@
-from .entities import ResourceType
+import heapq
+
+from .entities import Unit, Building, ResourceNode, ResourceType, EntityType, UnitState
+from .pool import EntityPool
+
+# Snapshots are plain tuples: one record per entity plus the scalar state.
+# They are never mutated, so one snapshot can seed any number of forks, and
+# taking one costs a pass over the entities rather than a deepcopy of them.
+# Stats dicts come from the unit data and are shared, not copied.
+
+def _pack(e):
+    if e.entity_type == EntityType.UNIT:
+        target = e.target.id if e.target is not None else None
+        return (EntityType.UNIT, e.id, e.name, e.stats, e.state, target, e.gather_type,
+                e.held_resource, e.max_carry, e.gather_rate)
+    if e.entity_type == EntityType.BUILDING:
+        return (EntityType.BUILDING, e.id, e.name, e.stats, tuple(e.production_queue), e.progress)
+    return (EntityType.RESOURCE, e.id, e.name, e.resource_type, e.amount)
+
+def _unpack(record, pool):
+    # Rebuild an entity from the pool, keeping its recorded id
+    kind, entity_id, name = record[:3]
+    if kind == EntityType.UNIT:
+        e = pool._take(Unit)
+        (_, _, _, e.stats, e._state, e.target, e.gather_type,
+         e.held_resource, e.max_carry, e.gather_rate) = record
+        e._owner = None
+    elif kind == EntityType.BUILDING:
+        e = pool._take(Building)
+        e.stats = record[3]
+        e.production_queue = list(record[4])
+        e.progress = record[5]
+    else:
+        e = pool._take(ResourceNode)
+        e.resource_type, e.amount = record[3:]
+    e.id = entity_id
+    e.name = name
+    e.entity_type = kind
+    return e
 
 class GameState:
-    def __init__(self):
+    def __init__(self, pool=None):
         self.time = 0
         self.resources = {
             ResourceType.FOOD: 200, # Standard start
@@ -13,9 +51,153 @@ class GameState:
         self.max_population = 5 # Start with Town Center pop space? Actually usually 4 + 4 (houses)
         self.entities = []
         self.tech_tree = set()
+        # Entity ids are allocated per state, so they are the same in every
+        # run of the same scenario however many simulations share the process
+        self.next_id = 0
+        self.pool = pool if pool is not None else EntityPool()
+
+        # Indexes over `entities`, kept current by add_entity / remove_entity,
+        # Unit.state assignments and building_changed(). Inner dicts are
+        # {id: entity}, so membership changes are O(1).
+        self.by_id = {}
+        self.by_name = {}                              # (EntityType, name) -> {id: entity}
+        self.by_state = {s: {} for s in UnitState}     # UnitState -> {id: unit}
+        self.idle_buildings = {}                       # name -> {id: building} with an empty queue
+        self.idle_units = {}                           # name -> ([ids, min-heap], {id: idle unit})
+        self.buildings = {}                            # id -> building, in add order
+        self.gather_version = 0                        # bumped whenever the set of gatherers changes
         
     def add_entity(self, entity):
+        if entity.id is None:
+            entity.id = self.next_id
+            self.next_id += 1
         self.entities.append(entity)
+        self.by_id[entity.id] = entity
+        self.by_name.setdefault((entity.entity_type, entity.name), {})[entity.id] = entity
+        if entity.entity_type == EntityType.UNIT:
+            entity._owner = self
+            self.by_state[entity.state][entity.id] = entity
+            if entity.state == UnitState.IDLE:
+                self._idle_add(entity)
+            if entity.state == UnitState.GATHERING:
+                self.gatherers_changed()
+        elif entity.entity_type == EntityType.BUILDING:
+            self.buildings[entity.id] = entity
+            self.building_changed(entity)
+
+    def remove_entity(self, entity):
+        self.entities.remove(entity)
+        del self.by_id[entity.id]
+        del self.by_name[(entity.entity_type, entity.name)][entity.id]
+        if entity.entity_type == EntityType.UNIT:
+            entity._owner = None
+            del self.by_state[entity.state][entity.id]
+            if entity.state == UnitState.IDLE:
+                self._idle_drop(entity)
+            if entity.state == UnitState.GATHERING:
+                self.gatherers_changed()
+        elif entity.entity_type == EntityType.BUILDING:
+            del self.buildings[entity.id]
+            self.idle_buildings.get(entity.name, {}).pop(entity.id, None)
+
+    def release(self):
+        # Hand every entity back to the pool; the state is empty afterwards
+        self.pool.release(self.entities)
+        self.entities = []
+        self.by_id = {}
+        self.by_name = {}
+        self.by_state = {s: {} for s in UnitState}
+        self.idle_buildings = {}
+        self.idle_units = {}
+        self.buildings = {}
+        self.gatherers_changed()
+
+    def snapshot(self):
+        return (self.time, tuple(self.resources.items()), self.population, self.max_population,
+                frozenset(self.tech_tree), tuple(_pack(e) for e in self.entities))
+
+    @classmethod
+    def from_snapshot(cls, snap, pool=None):
+        time, resources, population, max_population, tech_tree, records = snap
+        state = cls(pool)
+        state.time = time
+        state.resources = dict(resources)
+        state.population = population
+        state.max_population = max_population
+        state.tech_tree = set(tech_tree)
+        for record in records:
+            state.add_entity(_unpack(record, state.pool))
+        # Unit targets were stored as ids
+        for e in state.entities:
+            if e.entity_type == EntityType.UNIT and e.target is not None:
+                e.target = state.by_id[e.target]
+        return state
+
+    def unit_state_changed(self, unit, old_state):
+        # Called by the Unit.state setter
+        del self.by_state[old_state][unit.id]
+        self.by_state[unit.state][unit.id] = unit
+        if old_state == UnitState.IDLE:
+            self._idle_drop(unit)
+        elif unit.state == UnitState.IDLE:
+            self._idle_add(unit)
+        if UnitState.GATHERING in (old_state, unit.state):
+            self.gatherers_changed()
+
+    def gatherers_changed(self):
+        # Also call after retargeting a unit that is already gathering
+        self.gather_version += 1
+
+    def _idle_add(self, unit):
+        heap, idle = self.idle_units.setdefault(unit.name, ([], {}))
+        idle[unit.id] = unit
+        heapq.heappush(heap, unit.id)
+
+    def _idle_drop(self, unit):
+        # Its id stays in the heap until it reaches the top (see idle_unit),
+        # unless stale ids pile up
+        heap, idle = self.idle_units[unit.name]
+        del idle[unit.id]
+        if len(heap) > 2 * len(idle) + 16:
+            heap[:] = sorted(idle)
+
+    def building_changed(self, building):
+        # Call after pushing to / popping from a building's production queue
+        idle = self.idle_buildings.setdefault(building.name, {})
+        if building.production_queue:
+            idle.pop(building.id, None)
+        else:
+            idle[building.id] = building
+
+    # Lookups. Where several entities match, the one with the lowest id (the
+    # oldest) wins, which is the one a scan over `entities` would find first.
+
+    def get(self, entity_id):
+        return self.by_id.get(entity_id)
+
+    def find(self, entity_type, name):
+        found = self.by_name.get((entity_type, name))
+        return next(iter(found.values())) if found else None
+
+    def count(self, entity_type, name):
+        return len(self.by_name.get((entity_type, name), ()))
+
+    def idle_building(self, name):
+        idle = self.idle_buildings.get(name)
+        return idle[min(idle)] if idle else None
+
+    def idle_unit(self, prefix=""):
+        # Oldest idle unit whose name starts with `prefix`; only looks at the
+        # front of each matching name's heap, not at every idle unit
+        best = None
+        for name, (heap, idle) in self.idle_units.items():
+            if not idle or not name.startswith(prefix):
+                continue
+            while heap[0] not in idle:
+                heapq.heappop(heap)
+            if best is None or heap[0] < best.id:
+                best = idle[heap[0]]
+        return best
         
     def get_resource(self, res_type):
         return self.resources.get(res_type, 0)
@@ -28,4 +210,3 @@ class GameState:
         # costs is dict like {"Food": 50, "Wood": 20}
         # mapped to ResourceType
         pass # Need mapping helper
-
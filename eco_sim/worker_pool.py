@@ -0,0 +1,104 @@
+import numpy as np
+
+from .entities import EntityType, UnitState
+
+# Array-backed villager economy.
+#
+# Every gathering villager is one row of parallel NumPy arrays (target node,
+# held amount, carry capacity). Rows are sorted by node, then by entity order,
+# so each node's gatherers form one contiguous slice. A step resolves a whole
+# slice at once:
+#   - contention: gatherers on a node take a full share each, in entity order,
+#     until it runs dry; np.subtract.accumulate reproduces the object engine's
+#     one-after-another subtraction exactly, so the last gatherer gets the same
+#     remainder and everyone after it gets nothing
+#   - drop-off: full villagers bank what they hold (in entity order, same as
+#     Simulator._update_unit) and start again from 0
+#
+# The arrays own the held amounts while the pool is loaded. Unit.held_resource
+# is only brought up to date by sync(), which the Simulator calls before
+# snapshots and event skips. The pool reloads itself whenever
+# GameState.gather_version changes, i.e. a unit starts or stops gathering.
+# Retargeting a villager that is already gathering has to go through
+# GameState.gatherers_changed().
+
+
+class WorkerPool:
+    def __init__(self, state, rate):
+        self.state = state
+        self.rate = rate
+        self.version = None
+        self._clear()
+
+    def _clear(self):
+        self.units = []   # row -> Unit
+        self.nodes = []   # node index -> ResourceNode
+        self.slices = []  # node index -> (start, stop) rows
+        self.held = np.zeros(0)
+        self.max_carry = np.zeros(0)
+
+    def _load(self):
+        self.sync()
+        gathering = [u for u in self.state.by_state[UnitState.GATHERING].values()
+                     if u.target is not None and u.target.entity_type == EntityType.RESOURCE]
+        gathering.sort(key=lambda u: u.id)  # entity order
+
+        node_index = {}
+        for u in gathering:
+            node_index.setdefault(u.target, len(node_index))
+        units = sorted(gathering, key=lambda u: node_index[u.target])  # stable: entity order per node
+
+        self.units = units
+        self.nodes = list(node_index)
+        self.slices = []
+        start = 0
+        for node in self.nodes:
+            stop = start
+            while stop < len(units) and units[stop].target is node:
+                stop += 1
+            self.slices.append((start, stop))
+            start = stop
+        self.order = np.argsort([u.id for u in units], kind='stable')  # rows in entity order
+        self.held = np.array([u.held_resource for u in units], dtype=np.float64)
+        self.max_carry = np.array([u.max_carry for u in units], dtype=np.float64)
+        self.version = self.state.gather_version
+
+    def sync(self):
+        # Push held amounts back onto the Unit objects
+        for u, held in zip(self.units, self.held.tolist()):
+            u.held_resource = held
+
+    def release(self):
+        # Sync and forget every row; the next step reloads from the Units
+        self.sync()
+        self._clear()
+        self.version = None
+
+    def step(self, dt):
+        if self.version != self.state.gather_version:
+            self._load()
+        if not self.units:
+            return
+
+        share = self.rate * dt
+        taken = np.zeros(len(self.units))
+        active = np.zeros(len(self.units), dtype=bool)
+        for node, (start, stop) in zip(self.nodes, self.slices):
+            if node.amount <= 0:
+                continue
+            # Amount left on the node before each gatherer's turn
+            before = np.full(stop - start, share)
+            before[0] = node.amount
+            before = np.subtract.accumulate(before)
+            took = np.clip(before, 0.0, share)
+            taken[start:stop] = took
+            active[start:stop] = before > 0
+            last = float(before[-1])
+            node.amount = last - float(took[-1]) if last > 0 else 0.0
+
+        self.held += taken
+        full = active & (self.held >= self.max_carry)
+        if full.any():
+            for row in self.order[full[self.order]].tolist():
+                self.state.add_resource(self.units[row].target.resource_type, float(self.held[row]))
+            self.held[full] = 0.0
@@ -0,0 +1,123 @@
+import sys
+from collections import OrderedDict
+
+# Prefix-trie checkpoint cache for build-order evaluation.
+#
+# Elitism and single-point crossover leave most of a population sharing long
+# action prefixes. Everything that happens before the executor runs step k
+# depends only on the first k actions, so the simulation at that moment can
+# be stored under that prefix and reused by any genome that starts with it.
+#
+# Each trie node is one action; a node may hold a checkpoint (a Simulator
+# snapshot plus the tick count). lookup() walks a genome's actions and returns
+# the deepest checkpoint on the way. Checkpoints are evicted least recently
+# used first once their estimated size passes `budget` bytes, and nodes left
+# with neither a checkpoint nor children are pruned.
+
+
+def _snapshot_size(snap):
+    # Shallow sizes of the snapshot tuples; shared stats dicts and the unit
+    # catalog are not counted, they belong to every checkpoint at once
+    state, _, _, order, _ = snap
+    size = sys.getsizeof(snap) + sys.getsizeof(state) + sys.getsizeof(state[-1])
+    size += sum(sys.getsizeof(r) for r in state[-1])
+    if order is not None:
+        size += sys.getsizeof(order)
+    return size
+
+
+class _Node:
+    __slots__ = ('parent', 'action', 'children', 'checkpoint', 'size')
+
+    def __init__(self, parent=None, action=None):
+        self.parent = parent
+        self.action = action
+        self.children = {}
+        self.checkpoint = None
+        self.size = 0
+
+
+class CheckpointTrie:
+    def __init__(self, budget=64 * 1024 * 1024):
+        self.budget = budget
+        self.root = _Node()
+        self.context = None         # whatever the checkpoints are only valid for
+        self.used = 0
+        self._lru = OrderedDict()   # node -> None, oldest first
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.steps_skipped = 0
+
+    def __len__(self):
+        return len(self._lru)
+
+    def clear(self, context=None):
+        self.root = _Node()
+        self.context = context
+        self.used = 0
+        self._lru.clear()
+
+    def lookup(self, actions):
+        # Returns (depth, checkpoint) for the deepest cached prefix, or (0, None)
+        node = self.root
+        best = None
+        depth = 0
+        for i, action in enumerate(actions):
+            node = node.children.get(action)
+            if node is None:
+                break
+            if node.checkpoint is not None:
+                best = node
+                depth = i + 1
+
+        if best is None:
+            self.misses += 1
+            return 0, None
+        self.hits += 1
+        self.steps_skipped += depth
+        self._lru.move_to_end(best)
+        return depth, best.checkpoint
+
+    def store(self, actions, checkpoint):
+        # Cache `checkpoint` under the prefix `actions`, unless already there
+        node = self.root
+        for action in actions:
+            child = node.children.get(action)
+            if child is None:
+                child = node.children[action] = _Node(node, action)
+            node = child
+        if node.checkpoint is not None:
+            self._lru.move_to_end(node)
+            return
+
+        node.checkpoint = checkpoint
+        node.size = _snapshot_size(checkpoint[0])
+        self.used += node.size
+        self._lru[node] = None
+        while self.used > self.budget and self._lru:
+            self._evict(next(iter(self._lru)))
+
+    def _evict(self, node):
+        del self._lru[node]
+        self.used -= node.size
+        node.checkpoint = None
+        node.size = 0
+        self.evictions += 1
+        # Prune branches that no longer lead to any checkpoint
+        while node.parent is not None and not node.children and node.checkpoint is None:
+            del node.parent.children[node.action]
+            node = node.parent
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'steps_skipped': self.steps_skipped,
+            'checkpoints': len(self._lru),
+            'bytes': self.used,
+            'evictions': self.evictions,
+        }
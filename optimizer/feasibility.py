@@ -0,0 +1,262 @@
+import math
+
+from eco_sim.catalog import RESOURCE_ORDER, catalog_for
+from eco_sim.entities import EntityType, ResourceType, UnitState
+from eco_sim.executor import ActionType
+from eco_sim.simulator import GATHER_RATE, DEFAULT_TRAIN_TIME
+from eco_sim.start import START_BUILDINGS, START_NODES, START_RESOURCES, START_UNITS
+
+# Static feasibility pass over a build order.
+#
+# Walks the action list once, without simulating, keeping upper bounds on what
+# the Fitness start (see eco_sim/start.py for the constants) could ever reach
+# within `max_time` seconds:
+#   - gatherers: one per GATHER step executed so far, and never more than the
+#     villagers that exist or are queued
+#   - resources: start amount plus GATHER_RATE * max_time per gatherer, capped
+#     by what the resource nodes hold
+#   - time: trains at one building run one after another
+# The first step that can never execute stalls the Executor for good, so
+# nothing after it counts. The stall reasons are:
+#   'unsupported'  - an action the Executor has no handler for (BUILD)
+#   'unknown'      - unit not in the unit data, or building / node not present
+#   'idle'         - GATHER with every villager already gathering
+#   'resources'    - cumulative cost beyond the resource upper bound
+#   'time'         - the building is busy until after max_time
+# For a unit-count target the genome is infeasible when the steps before the
+# stall cannot produce enough units, or not before max_time. Infeasible
+# genomes can never complete, so Fitness(prune=True) gives them `score_bound`,
+# an upper bound on the partial score the simulation would award. That is
+# still below any completing score (10000 - max_time), but it is not the real
+# partial score, so it changes how non-completers rank against each other.
+#
+# Population is not checked: the Simulator does not enforce max_population.
+
+
+def analyze(actions, catalog, target=None, max_time=600):
+    # actions: [(ActionType, target, param), ...]; target: {unit name: count} or None
+    start = [float(START_RESOURCES.get(r, 0)) for r in RESOURCE_ORDER]
+    node_total = [0.0] * len(RESOURCE_ORDER)
+    node_names = set()
+    for name, res, amount in START_NODES:
+        node_total[RESOURCE_ORDER.index(res)] += amount
+        node_names.add(name)
+    per_gatherer = GATHER_RATE * max_time
+
+    spent = [0.0] * len(RESOURCE_ORDER)
+    busy_until = {}  # building name -> earliest time each one is free
+    for b in START_BUILDINGS:
+        busy_until.setdefault(b, []).append(0.0)
+    villagers = sum(1 for u in START_UNITS if u.startswith("Villager"))
+    gatherers = 0
+    units = {}
+    for u in START_UNITS:
+        units[u] = units.get(u, 0) + 1
+    ready = {}  # unit name -> earliest completion time of each one trained
+
+    stall_step = None
+    reason = None
+    for k, (action, unit, param) in enumerate(actions):
+        if action == ActionType.TRAIN:
+            if unit not in catalog or param not in busy_until:
+                stall_step, reason = k, 'unknown'
+                break
+            cost = catalog.cost_vector(unit)
+            gathered = [min(node_total[i], per_gatherer * gatherers) for i in range(len(start))]
+            spent = [s + c for s, c in zip(spent, cost)]
+            if any(s > st + g for s, st, g in zip(spent, start, gathered)):
+                stall_step, reason = k, 'resources'
+                break
+            # Earliest start: a building free and the missing resources gathered
+            free = busy_until[param]
+            slot = free.index(min(free))
+            earliest = free[slot]
+            for s, st in zip(spent, start):
+                if s > st:
+                    earliest = max(earliest, (s - st) / (GATHER_RATE * gatherers))
+            if earliest >= max_time:
+                stall_step, reason = k, 'time'
+                break
+            done = earliest + catalog.train_time(unit, DEFAULT_TRAIN_TIME)
+            free[slot] = done
+            ready.setdefault(unit, []).append(done)
+            units[unit] = units.get(unit, 0) + 1
+            if unit.startswith("Villager"):
+                villagers += 1
+        elif action == ActionType.GATHER:
+            if param not in node_names:
+                stall_step, reason = k, 'unknown'
+                break
+            if gatherers >= villagers:
+                stall_step, reason = k, 'idle'
+                break
+            gatherers += 1
+        else:
+            stall_step, reason = k, 'unsupported'
+            break
+
+    feasible = True
+    earliest_finish = None
+    if target:
+        earliest_finish = 0.0
+        for name, count in target.items():
+            missing = count - START_UNITS.count(name)
+            if missing <= 0:
+                continue
+            times = sorted(ready.get(name, []))
+            if len(times) < missing or times[missing - 1] > max_time:
+                feasible = False
+                earliest_finish = math.inf
+                break
+            earliest_finish = max(earliest_finish, times[missing - 1])
+
+    food = RESOURCE_ORDER.index(ResourceType.FOOD)
+    entities = len(START_BUILDINGS) + len(START_NODES) + sum(units.values())
+    food_bound = start[food] + min(node_total[food], per_gatherer * gatherers)
+    return {
+        'feasible': feasible,
+        'stall_step': stall_step,
+        'reason': reason,
+        'earliest_finish': earliest_finish,
+        'score_bound': food_bound + entities * 100,
+    }
+
+
+class FeasibilityFilter:
+    # Memoizing front end used by Fitness
+    def __init__(self, unit_data, max_time=600):
+        self.catalog = catalog_for(unit_data)
+        self.max_time = max_time
+        self._cache = {}
+        self.checked = 0
+        self.rejected = 0
+
+    def check(self, actions, target):
+        key = (tuple(actions), tuple(sorted(target.items())))
+        result = self._cache.get(key)
+        if result is None:
+            result = self._cache[key] = analyze(actions, self.catalog, target, self.max_time)
+        self.checked += 1
+        if not result['feasible']:
+            self.rejected += 1
+        return result
+
+
+def remaining_time(sim, executor, counts):
+    # Optimistic seconds until the running simulation can meet `counts`
+    # ({unit name: count}), math.inf when it never can. Used by Fitness to
+    # stop genomes that can no longer complete. Every relaxation errs early:
+    #   - queued units finish exactly when their building's queue runs out
+    #   - the remaining TRAIN steps are queued in order, each on the earliest
+    #     free building of its type, as soon as the cumulative cost of the
+    #     steps so far could be gathered by every villager that exists or
+    #     will be trained, all on that resource, with no drop-off delay
+    #   - GATHER steps never block
+    state = sim.state
+    missing = {}
+    for name, n in counts.items():
+        short = n - state.count(EntityType.UNIT, name)
+        if short > 0:
+            missing[name] = short
+    if not missing:
+        return 0.0
+
+    finish = {name: [] for name in missing}  # unit name -> seconds from now each one appears
+    free = {}  # building name -> seconds from now each one is idle
+    villagers = 0
+    for b in state.buildings.values():
+        t = 0.0
+        for unit, needed in b.production_queue:
+            t += needed
+            if unit in finish:
+                finish[unit].append(t)
+            if unit.startswith("Villager"):
+                villagers += 1
+        free.setdefault(b.name, []).append(t)
+
+    catalog = sim.catalog
+    steps = [(unit, param) for action, unit, param in executor.build_order[executor.current_step:]
+             if action == ActionType.TRAIN]
+    for (kind, name), found in state.by_name.items():
+        if kind == EntityType.UNIT and name.startswith("Villager"):
+            villagers += len(found)
+    villagers += sum(1 for unit, _ in steps if unit.startswith("Villager"))
+
+    # What could still be banked, per resource: banked + carried + left in nodes
+    banked = {r: float(state.get_resource(r)) for r in RESOURCE_ORDER}
+    available = dict(banked)
+    for u in state.by_state[UnitState.GATHERING].values():
+        if u.target is not None and u.target.entity_type == EntityType.RESOURCE:
+            available[u.target.resource_type] += u.held_resource
+            banked[u.target.resource_type] += u.held_resource
+    for (kind, _), found in state.by_name.items():
+        if kind == EntityType.RESOURCE:
+            for node in found.values():
+                available[node.resource_type] += node.amount
+
+    rate = GATHER_RATE * villagers
+    spent = dict.fromkeys(RESOURCE_ORDER, 0.0)
+    short = sum(max(0, n - len(finish[name])) for name, n in missing.items())
+    train_times = {}
+    start = 0.0
+    for unit, param in steps:
+        if short <= 0:
+            break  # later steps cannot make the target any earlier
+        costs = catalog.costs(unit)
+        slots = free.get(param)
+        if costs is None or not slots:
+            break  # the Executor stalls here for good
+        stalled = False
+        for r, amount in costs:
+            spent[r] += amount
+            deficit = spent[r] - banked[r]
+            if deficit > 0:
+                if spent[r] > available[r] or rate <= 0:
+                    stalled = True
+                    break
+                start = max(start, deficit / rate)
+        if stalled:
+            break
+        slot = slots.index(min(slots))
+        start = max(start, slots[slot])
+        train_time = train_times.get(unit)
+        if train_time is None:
+            train_time = train_times[unit] = catalog.train_time(unit, DEFAULT_TRAIN_TIME)
+        slots[slot] = start + train_time
+        if unit in finish:
+            finish[unit].append(slots[slot])
+            if len(finish[unit]) <= missing[unit]:
+                short -= 1
+
+    worst = 0.0
+    for name, short in missing.items():
+        times = sorted(finish[name])
+        if len(times) < short:
+            return math.inf
+        worst = max(worst, times[short - 1])
+    return worst
+
+
+def score_range(sim, executor):
+    # (lowest, highest) partial score the running simulation could still end
+    # with if it never completes: entities are never removed, every remaining
+    # TRAIN step adds at most one, and food only goes up by gathering and down
+    # by paying for those steps
+    state = sim.state
+    food = ResourceType.FOOD
+    steps = [unit for action, unit, _ in executor.build_order[executor.current_step:]
+             if action == ActionType.TRAIN]
+    queued = sum(len(b.production_queue) for b in state.buildings.values())
+    food_cost = 0.0
+    for unit in steps:
+        for r, amount in sim.catalog.costs(unit) or ():
+            if r == food:
+                food_cost += amount
+
+    banked = float(state.get_resource(food))
+    more = sum(u.held_resource for u in state.by_state[UnitState.GATHERING].values())
+    more += sum(e.amount for e in state.entities
+                if e.entity_type == EntityType.RESOURCE and e.resource_type == food)
+    entities = len(state.entities)
+    return (max(0.0, banked - food_cost) + entities * 100,
+            banked + more + (entities + queued + len(steps)) * 100)
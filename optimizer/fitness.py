@@ -1,45 +1,188 @@
+import hashlib
+import json
+
 from eco_sim.simulator import Simulator
 from eco_sim.executor import Executor
-from eco_sim.entities import Building, ResourceNode, ResourceType, UnitState
+from eco_sim.entities import ResourceType, EntityType
+from eco_sim.pool import EntityPool
+from eco_sim import start
+from .feasibility import FeasibilityFilter, remaining_time, score_range
+from .fitness_cache import actions_hash, target_key
+
+
+MAX_TIME = 600  # 10 minutes limit
+ESTIMATE_EVERY = 30  # ticks between branch-and-bound finish estimates
+
+
+class UnitCountTarget:
+    # Target check for "have at least N of each unit". Unlike an arbitrary
+    # callable its counts are visible, so Fitness can rule out genomes that
+    # can never reach it without simulating them (see feasibility.py).
+    def __init__(self, counts):
+        self.counts = dict(counts)
+
+    def __call__(self, sim):
+        return all(sim.state.count(EntityType.UNIT, name) >= n for name, n in self.counts.items())
+
+
+class CutScore(float):
+    # Score of a simulation Fitness stopped early because it could no longer
+    # complete while a completing score was the bound to beat: the least
+    # partial score the run is guaranteed to end with, not its real one.
+    # Runs that might still complete are never cut, so every completing build
+    # order keeps its exact score and ranks above every cut one.
+    pass
+
+
+def _cutting(target_check_fn, bound):
+    # Whether evaluating with `bound` cuts runs: only for a UnitCountTarget,
+    # whose counts the finish estimate needs, and only against a completing
+    # score, which no run that cannot complete can beat
+    counts = getattr(target_check_fn, 'counts', None)
+    return bool(counts) and bound is not None and bound >= 10000 - MAX_TIME
+
+
+def _reusable(score, cutting):
+    # Whether `score`, from an earlier evaluation, is what evaluating with or
+    # without cutting would return. Completing runs are never cut.
+    if isinstance(score, CutScore):
+        return cutting
+    return not cutting or score >= 10000 - MAX_TIME
+
 
 class Fitness:
-    def __init__(self, unit_data):
+    def __init__(self, unit_data, mode='tick', checkpoints=None, prune=False, cache=None):
+        # mode: 'tick' runs the simulator one second at a time,
+        #       'event' skips ahead to the next drop-off / production / depletion
+        #       whenever the build order is blocked (see Simulator.advance).
+        #       Both give the same score as long as target_check_fn only looks
+        #       at entities and banked resources.
+        if mode not in ('tick', 'event'):
+            raise ValueError(f"Unknown fitness mode: {mode}")
         self.unit_data = unit_data
+        self.mode = mode
+        # Optional CheckpointTrie: resume each genome from its deepest cached
+        # action prefix instead of from t=0
+        self.checkpoints = checkpoints
+        # Entities of finished evaluations are recycled for the next one
+        self.pool = EntityPool()
+        # Optional static check that skips genomes which can never reach a
+        # UnitCountTarget. Off by default: they score an upper bound on their
+        # partial score instead of the real one, which reorders non-completers
+        self.feasibility = FeasibilityFilter(unit_data) if prune else None
+        # Optional FitnessCache of scores by action list and target
+        self.cache = cache
+        self._context = None
+        if cache is not None:
+            units_hash = hashlib.sha256(json.dumps(unit_data, sort_keys=True).encode('utf-8')).hexdigest()
+            self._context = f"{mode}:{int(prune)}:{units_hash[:16]}"
+        self.cut = 0  # evaluations stopped early by a bound
 
-    def evaluate(self, genome, target_check_fn):
-        # Setup Simulation
-        sim = Simulator()
-        sim.load_unit_data(self.unit_data)
-        
-        # Setup Standard Start (should probably be configurable)
-        tc = Building("Town Center")
-        sim.state.add_entity(tc)
-        
-        berries = ResourceNode("Berry Bush", ResourceType.FOOD, 2000)
-        sim.state.add_entity(berries)
-        
-        sim.state.resources[ResourceType.FOOD] = 200
-        sim.state.resources[ResourceType.WOOD] = 200
-        sim.state.population = 0
-        sim.state.max_population = 5 
-        
-        # Initial Villagers (usually 3)
-        for _ in range(3):
-            sim._spawn_unit("Villager (Age of Empires)")
-            
-        executor = Executor(sim)
-        executor.load_order(genome.actions)
-        
-        max_time = 600 # 10 minutes limit
+    def lookup(self, genome, target_check_fn, bound=None):
+        # Cached score, or None when there is none that evaluating with
+        # `bound` would return
+        if self.cache is None:
+            return None
+        cutting = _cutting(target_check_fn, bound)
+        key, persistent = self._cache_key(genome, target_check_fn)
+        if key is None:
+            return None
+        return self.cache.get(key, persistent, accept=lambda score: _reusable(score, cutting))
+
+    def remember(self, genome, target_check_fn, score):
+        if self.cache is not None:
+            key, persistent = self._cache_key(genome, target_check_fn)
+            if key is not None:
+                # Cut scores depend on branch and bound, keep them out of the file
+                self.cache.put(key, score, persistent and not isinstance(score, CutScore))
+
+    def _cache_key(self, genome, target_check_fn):
+        # (cache key, whether it may be persisted); None for targets that
+        # cannot be cached
+        target, persistent = target_key(target_check_fn)
+        if target is None:
+            return None, False
+        if not persistent:
+            self.cache.watch(target_check_fn, target)
+        return f"{self._context}:{target}:{actions_hash(genome.actions)}", persistent
+
+    def evaluate(self, genome, target_check_fn, bound=None):
+        # bound: best score found so far. When it is a completing score, a
+        # simulation that provably can no longer complete stops and returns a
+        # CutScore instead of the full score.
+        score = self.lookup(genome, target_check_fn, bound)
+        if score is None:
+            score = self.simulate(genome, target_check_fn, bound)
+        return score
+
+    def simulate(self, genome, target_check_fn, bound=None):
+        # evaluate() without the cache lookup, for a genome lookup() has just
+        # missed; the score is still remembered
+        score = self._evaluate(genome, target_check_fn, _cutting(target_check_fn, bound))
+        self.remember(genome, target_check_fn, score)
+        return score
+
+    def _evaluate(self, genome, target_check_fn, cutting=False):
+        counts = getattr(target_check_fn, 'counts', None)
+        if self.feasibility is not None and counts:
+            check = self.feasibility.check(genome.actions, counts)
+            if not check['feasible']:
+                return check['score_bound']
+
+        max_time = MAX_TIME
         completed = False
+
+        # Cut checks look at the whole remaining build order, so a run
+        # resumed from another genome's checkpoint would skip the checks this
+        # genome makes on the shared prefix. Runs that cut start from t=0.
+        checkpoints = None if cutting else self.checkpoints
+        depth = 0
+        if checkpoints is not None:
+            # Checkpoints only hold for the target and stepping they were taken with
+            context = (target_check_fn, self.mode)
+            if checkpoints.context != context:
+                checkpoints.clear(context)
+            depth, checkpoint = checkpoints.lookup(genome.actions)
+
+        if depth:
+            snap, ticks = checkpoint
+            sim, executor = Simulator.from_snapshot(snap, build_order=genome.actions, pool=self.pool)
+        else:
+            sim, executor = self._start(genome)
+            ticks = 0
+
+        # Branch and bound: against a completing best score, a run that can
+        # no longer complete within max_time cannot win. The optimistic
+        # finish estimate runs after a step executes and every ESTIMATE_EVERY
+        # ticks. It errs early, so a run that might still complete, however
+        # late, is simulated to the end.
+        recheck = (ticks // ESTIMATE_EVERY + 1) * ESTIMATE_EVERY
         
-        for _ in range(max_time):
-            executor.update()
-            sim.tick(1.0)
+        while ticks < max_time:
+            executed = executor.update()
+            if executed or self.mode == 'tick':
+                sim.tick(1.0)
+                ticks += 1
+            else:
+                ticks += sim.advance(max_time - ticks, 1.0)
             
             if target_check_fn(sim):
                 completed = True
                 break
+
+            if cutting and (executed or ticks >= recheck):
+                recheck = (ticks // ESTIMATE_EVERY + 1) * ESTIMATE_EVERY
+                if sim.state.time + max(remaining_time(sim, executor, counts), 1.0) > max_time:
+                    low, high = score_range(sim, executor)
+                    if high < 10000 - max_time:
+                        self.cut += 1
+                        sim.state.release()
+                        return CutScore(low)
+
+            if executed and checkpoints is not None:
+                # Nothing up to here depended on the actions after this step
+                step = executor.current_step
+                checkpoints.store(genome.actions[:step], (sim.snapshot(executor), ticks))
         
         score = 0
         if completed:
@@ -50,5 +193,44 @@ class Fitness:
             # Ideally we want close to target.
             # For now, just resources gathered + pop count as tie breaker
             score = sim.state.get_resource(ResourceType.FOOD) + (len(sim.state.entities) * 100)
-            
+
+        sim.state.release()
         return score
+
+    def evaluate_batch(self, genomes, target_check_fn):
+        # Same scores as evaluate() without a bound, for a UnitCountTarget.
+        # Cached and statically infeasible genomes are scored as there; the
+        # rest are simulated in lockstep in one BatchSimulator call.
+        counts = getattr(target_check_fn, 'counts', None)
+        if counts is None:
+            raise TypeError("evaluate_batch needs a UnitCountTarget")
+        scores = [self.lookup(genome, target_check_fn) for genome in genomes]
+        todo = []
+        for i, genome in enumerate(genomes):
+            if scores[i] is None and self.feasibility is not None:
+                check = self.feasibility.check(genome.actions, counts)
+                if not check['feasible']:
+                    scores[i] = check['score_bound']
+                    self.remember(genome, target_check_fn, scores[i])
+            if scores[i] is None:
+                todo.append(i)
+
+        if todo:
+            from eco_sim.batch import BatchSimulator
+            result = BatchSimulator(self.unit_data).run([genomes[i].actions for i in todo], counts)
+            for i, score in zip(todo, result['score'].tolist()):
+                scores[i] = score
+                self.remember(genomes[i], target_check_fn, score)
+        return scores
+
+    def _start(self, genome):
+        # Setup Simulation
+        sim = Simulator(pool=self.pool)
+        sim.load_unit_data(self.unit_data)
+        
+        # Standard start, shared with BatchSimulator and feasibility.py
+        start.setup(sim)
+
+        executor = Executor(sim)
+        executor.load_order(genome.actions)
+        return sim, executor
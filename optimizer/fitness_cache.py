@@ -0,0 +1,164 @@
+import hashlib
+import json
+import sqlite3
+import uuid
+import weakref
+from collections import OrderedDict
+
+# Fitness memo cache.
+#
+# Scores are keyed by a canonical hash of the genome's action list plus a
+# context string: the Fitness settings, a hash of the unit data and the
+# target's identity. Identical action lists therefore hit no matter which
+# Genome object carries them, and elites carried over unchanged are never
+# re-simulated.
+#
+# The in-memory layer is an LRU of `max_entries` scores. With `path`, scores
+# are also written to a SQLite file and looked up there on a memory miss, so a
+# later run with the same settings, unit data and target starts warm. Only
+# targets with a stable identity (UnitCountTarget) are persisted. Any other
+# callable gets a key of its own that is never reused (object ids are, once the
+# object is freed), is kept in memory only, and its entries are dropped when
+# it is garbage collected. Callables that cannot be weakly referenced are not
+# cached at all.
+#
+# end_generation() closes the current generation's hit/miss counts into
+# `history` and commits pending disk writes. state() / restore() carry the
+# in-memory layer through Optimizer run checkpoints.
+
+
+_target_refs = weakref.WeakKeyDictionary()  # target without stable identity -> its key
+
+
+def target_key(target):
+    # (identity string, whether it is stable across processes and runs);
+    # (None, False) when the target cannot be cached
+    counts = getattr(target, 'counts', None)
+    if counts is not None:
+        return 'counts:' + json.dumps(sorted(counts.items())), True
+    try:
+        key = _target_refs.get(target)
+        if key is None:
+            key = _target_refs[target] = f"ref:{uuid.uuid4().hex}"
+    except TypeError:
+        return None, False
+    return key, False
+
+
+def _forget(cache_ref, target):
+    cache = cache_ref()
+    if cache is not None:
+        cache.forget(target)
+
+
+def actions_hash(actions):
+    return hashlib.sha256(json.dumps([list(a) for a in actions]).encode('utf-8')).hexdigest()
+
+
+class FitnessCache:
+    def __init__(self, max_entries=100000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self._memory = OrderedDict()  # key -> score, oldest first
+        self._watched = set()  # target keys dropped when their target dies
+        self._db = None
+        if path is not None:
+            self._db = sqlite3.connect(path)
+            self._db.execute('CREATE TABLE IF NOT EXISTS scores (key TEXT PRIMARY KEY, score REAL)')
+
+        self.hits = 0
+        self.misses = 0
+        self.history = []  # per generation: {'hits', 'misses', 'hit_rate'}
+        self._gen_hits = 0
+        self._gen_misses = 0
+
+    def __len__(self):
+        return len(self._memory)
+
+    def get(self, key, persistent=False, accept=None):
+        # accept: optional check on the stored score; rejected scores count
+        # as misses
+        score = self._memory.get(key)
+        if score is not None:
+            self._memory.move_to_end(key)
+        elif persistent and self._db is not None:
+            row = self._db.execute('SELECT score FROM scores WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                score = row[0]
+                self._remember(key, score)
+        if score is not None and accept is not None and not accept(score):
+            score = None
+
+        if score is None:
+            self.misses += 1
+            self._gen_misses += 1
+        else:
+            self.hits += 1
+            self._gen_hits += 1
+        return score
+
+    def put(self, key, score, persistent=False):
+        self._remember(key, score)
+        if persistent and self._db is not None:
+            self._db.execute('INSERT OR REPLACE INTO scores VALUES (?, ?)', (key, score))
+
+    def watch(self, target, target_id):
+        # Drop the entries keyed by `target_id` (from target_key) once
+        # `target` is garbage collected
+        if target_id not in self._watched:
+            self._watched.add(target_id)
+            weakref.finalize(target, _forget, weakref.ref(self), target_id)
+
+    def forget(self, target_id):
+        part = f":{target_id}:"
+        for key in [key for key in self._memory if part in key]:
+            del self._memory[key]
+        self._watched.discard(target_id)
+
+    def _remember(self, key, score):
+        self._memory[key] = score
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def end_generation(self):
+        lookups = self._gen_hits + self._gen_misses
+        stats = {
+            'hits': self._gen_hits,
+            'misses': self._gen_misses,
+            'hit_rate': self._gen_hits / lookups if lookups else 0.0,
+        }
+        self.history.append(stats)
+        self._gen_hits = 0
+        self._gen_misses = 0
+        if self._db is not None:
+            self._db.commit()
+        return stats
+
+    def state(self):
+        # In-memory entries and counters, for Optimizer run checkpoints.
+        # Entries of targets without a stable key die with this process.
+        return {
+            'entries': [(key, score) for key, score in self._memory.items() if ':ref:' not in key],
+            'hits': self.hits,
+            'misses': self.misses,
+            'history': list(self.history),
+        }
+
+    def restore(self, state):
+        self._memory = OrderedDict(state['entries'])
+        self.hits = state['hits']
+        self.misses = state['misses']
+        self.history = list(state['history'])
+        self._gen_hits = 0
+        self._gen_misses = 0
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def close(self):
+        if self._db is not None:
+            self._db.commit()
+            self._db.close()
+            self._db = None
@@ -0,0 +1,225 @@
+import multiprocessing
+import pickle
+import random
+import traceback
+
+from .genome import Genome
+from .optimizer import Optimizer
+
+# Island-model genetic algorithm.
+#
+# K Optimizer populations ("islands") evolve independently, each in its own
+# process, and every `migration_interval` generations exchange their best
+# genomes. The coordinator runs the islands one epoch at a time:
+#   1. every island runs `migration_interval` generations
+#   2. it reports its best score and genome and its top `migrants` genomes
+#   3. the coordinator sends each island the migrants of its neighbours in the
+#      topology, which replace that island's newest children
+# Topologies:
+#   'ring' - island i receives from island i - 1
+#   'full' - island i receives the best `migrants` of all other islands
+#
+# Each island seeds the `random` module from one master seed before it builds
+# its population, and only ever draws from its own stream, so a run is
+# reproducible from the seed. With processes=False the islands take turns in
+# this process, swapping their random state in and out, and give the same
+# result as with processes.
+
+TOPOLOGIES = ('ring', 'full')
+
+
+class Island:
+    # One Optimizer and the random state it evolves with
+    def __init__(self, unit_data, seed, options):
+        saved = random.getstate()
+        random.seed(seed)
+        self.optimizer = Optimizer(unit_data, verbose=False, **options)
+        self.rng_state = random.getstate()
+        random.setstate(saved)
+
+    def epoch(self, generations, target_check_fn, migrants):
+        saved = random.getstate()
+        random.setstate(self.rng_state)
+        try:
+            opt = self.optimizer
+            opt.run(generations, target_check_fn)
+        finally:
+            self.rng_state = random.getstate()
+            random.setstate(saved)
+        return {
+            'generation': opt.generation,
+            'best_score': opt.best_score,
+            'best_actions': list(opt.best_genome.actions),
+            'migrants': [(score, list(g.actions)) for score, g in opt.ranked[:migrants]],
+            'fallback_reason': opt.fallback_reason,
+        }
+
+    def immigrate(self, actions):
+        self.optimizer.immigrate([Genome(list(a)) for a in actions])
+
+    def close(self):
+        if self.optimizer.cache is not None:
+            self.optimizer.cache.close()
+
+
+def _island_main(conn, unit_data, seed, options):
+    # Island process: runs commands from the coordinator until it sends None
+    island = Island(unit_data, seed, options)
+    try:
+        while True:
+            message = conn.recv()
+            if message is None:
+                break
+            command, args = message
+            try:
+                conn.send(('ok', getattr(island, command)(*args)))
+            except Exception:
+                conn.send(('error', traceback.format_exc()))
+    finally:
+        island.close()
+        conn.close()
+
+
+class _RemoteIsland:
+    # Coordinator-side handle for an Island in its own process. Not a daemon,
+    # so the island's Optimizer can start its own worker pool (workers > 1);
+    # IslandModel.run always stops it through close().
+    def __init__(self, context, unit_data, seed, options):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_island_main, args=(child, unit_data, seed, options))
+        self.process.start()
+        child.close()
+
+    def send(self, command, *args):
+        self.conn.send((command, args))
+
+    def receive(self):
+        status, result = self.conn.recv()
+        if status == 'error':
+            raise RuntimeError(f"island failed:\n{result}")
+        return result
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+class _LocalIsland:
+    # Same interface as _RemoteIsland, run in this process
+    def __init__(self, unit_data, seed, options):
+        self.island = Island(unit_data, seed, options)
+        self._result = None
+
+    def send(self, command, *args):
+        self._result = getattr(self.island, command)(*args)
+
+    def receive(self):
+        return self._result
+
+    def close(self):
+        self.island.close()
+
+
+class IslandModel:
+    def __init__(self, unit_data, islands=4, population_size=50, migration_interval=5,
+                 migrants=2, topology='ring', seed=0, processes=True, **options):
+        # islands: number of populations (K)
+        # migration_interval: generations between migrations (M)
+        # migrants: genomes each island sends per migration
+        # processes: one process per island; False runs them in turn here
+        # options: passed on to each island's Optimizer (workers, cache_size, ...)
+        if topology not in TOPOLOGIES:
+            raise ValueError(f"Unknown migration topology: {topology}")
+        if islands < 1:
+            raise ValueError("IslandModel needs at least one island")
+        self.unit_data = unit_data
+        self.islands = islands
+        self.migration_interval = max(1, migration_interval)
+        self.migrants = migrants
+        self.topology = topology
+        self.seed = seed
+        self.processes = processes
+        self.options = dict(options, population_size=population_size)
+        self.fallback_reason = None  # why the last run used no processes despite processes=True
+        self.island_fallbacks = []  # per island: why its Optimizer evaluated serially, or None
+
+        self.history = []  # per epoch: {'generation', 'best_scores': [per island]}
+        self.best_score = None
+        self.best_genome = None
+        self.best_island = None
+
+    def island_seeds(self):
+        rng = random.Random(self.seed)
+        return [rng.getrandbits(64) for _ in range(self.islands)]
+
+    def run(self, generations, target_check_fn):
+        self.history = []
+        self.best_score = None
+        self.best_genome = None
+        self.best_island = None
+        islands = self._start(target_check_fn)
+        try:
+            done = 0
+            while done < generations:
+                n = min(self.migration_interval, generations - done)
+                for island in islands:
+                    island.send('epoch', n, target_check_fn, self.migrants)
+                reports = [island.receive() for island in islands]
+                done += n
+                self._collect(reports)
+                if done < generations:
+                    self._migrate(islands, reports)
+        finally:
+            for island in islands:
+                island.close()
+        return self.best_genome
+
+    def _start(self, target_check_fn):
+        self.fallback_reason = None
+        seeds = self.island_seeds()
+        if self.processes and self.islands > 1:
+            try:
+                pickle.dumps(target_check_fn)
+            except (pickle.PicklingError, AttributeError, TypeError) as e:
+                self.fallback_reason = f"target not picklable: {e}"
+            else:
+                context = multiprocessing.get_context()
+                started = []
+                try:
+                    for seed in seeds:
+                        started.append(_RemoteIsland(context, self.unit_data, seed, self.options))
+                    return started
+                except (OSError, NotImplementedError, ValueError) as e:
+                    self.fallback_reason = f"island processes unavailable: {e}"
+                    for island in started:
+                        island.close()
+        return [_LocalIsland(self.unit_data, seed, self.options) for seed in seeds]
+
+    def _collect(self, reports):
+        scores = [r['best_score'] for r in reports]
+        self.island_fallbacks = [r['fallback_reason'] for r in reports]
+        self.history.append({'generation': reports[0]['generation'], 'best_scores': scores})
+        for i, report in enumerate(reports):
+            if self.best_score is None or report['best_score'] > self.best_score:
+                self.best_score = report['best_score']
+                self.best_genome = Genome(list(report['best_actions']))
+                self.best_island = i
+
+    def _migrate(self, islands, reports):
+        k = len(islands)
+        for i, island in enumerate(islands):
+            if self.topology == 'ring':
+                incoming = reports[(i - 1) % k]['migrants']
+            else:
+                incoming = [m for j, r in enumerate(reports) if j != i for m in r['migrants']]
+                # Stable sort: ties keep island order, so the result is reproducible
+                incoming = sorted(incoming, key=lambda m: m[0], reverse=True)[:self.migrants]
+            if incoming:
+                island.send('immigrate', [actions for _, actions in incoming])
+                island.receive()
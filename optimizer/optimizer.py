@@ -1,33 +1,254 @@
 import json
+import multiprocessing
 import os
+import pickle
 import random
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from .genome import Genome
-from .fitness import Fitness
+from .fitness import Fitness, UnitCountTarget
+from .checkpoints import CheckpointTrie
+from .fitness_cache import FitnessCache, target_key
+
+# Parallel evaluation: each worker process builds its own Fitness (with its own
+# checkpoint cache and entity pool) from unit_data once, at startup. Genomes
+# travel as chunks of small-int action codes plus one shared table of the
+# distinct actions. pool.map returns scores in population order and
+# Fitness.evaluate is deterministic, so the run is the same as the serial one
+# for the same seed. Targets that cannot be pickled (lambdas, closures), a
+# daemonic parent process (which may not have children), or a pool whose
+# workers cannot spawn or break fall back to serial evaluation. Workers only
+# spawn on the first map, so spawn errors surface there, not at construction.
+
+_fitness = None  # per-process Fitness, set by _init_worker
+
+
+def _init_worker(unit_data, checkpoint_budget, prune):
+    global _fitness
+    checkpoints = CheckpointTrie(checkpoint_budget) if checkpoint_budget else None
+    _fitness = Fitness(unit_data, checkpoints=checkpoints, prune=prune)
+
+
+def _evaluate_chunk(task):
+    table, genomes, target_check_fn, bound = task
+    return [_fitness.evaluate(Genome([table[code] for code in codes]), target_check_fn, bound)
+            for codes in genomes]
+
+
+def _write_atomic(path, data):
+    # Readers see either the old file or the new one, never a partial write
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _encode(population):
+    # Genomes -> (distinct actions, one tuple of indices into them per genome)
+    index = {}
+    codes = [tuple(index.setdefault(action, len(index)) for action in g.actions) for g in population]
+    return list(index), codes
+
 
 class Optimizer:
-    def __init__(self, unit_data, population_size=50):
+    def __init__(self, unit_data, population_size=50, checkpoint_budget=64 * 1024 * 1024,
+                 workers=0, chunk_size=None, cache_size=100000, cache_path=None,
+                 branch_and_bound=False, prune=False, verbose=True, save_path=None, save_every=10,
+                 metrics_path=None, batch=False):
+        # workers: evaluation processes, None for os.cpu_count(), 0 or 1 for serial
+        # chunk_size: genomes per task, default spreads a generation over ~4 tasks per worker
+        # cache_size / cache_path: fitness memo cache entries (0 disables it) and
+        #         optional SQLite file to keep scores across runs
+        # branch_and_bound: once the previous generations found a completing
+        #         genome, stop simulating genomes that can no longer complete
+        #         (see Fitness.evaluate). Off by default: cut genomes get the
+        #         least partial score they are guaranteed instead of their
+        #         real one, so the search path differs from a run without it
+        # prune: give genomes that statically cannot reach a UnitCountTarget
+        #         an upper bound on their partial score instead of simulating
+        #         them (see feasibility.py). Off by default for the same reason
+        # verbose: print one line per generation
+        # save_path / save_every: file the run state (population, random state,
+        #         generation, best score, fitness cache) is atomically written to
+        #         every save_every generations; run(resume=True) continues from it
+        # metrics_path: JSONL file that gets one line of statistics per generation;
+        #         a resumed run repeats the generations after the last save, so
+        #         the last line for a generation is the one that counts
+        # batch: score each generation through the lockstep BatchSimulator when
+        #         the target is a UnitCountTarget (see Fitness.evaluate_batch);
+        #         it runs in this process and gives full scores, no bound cuts
         self.unit_data = unit_data
+        self.batch = batch
+        self.checkpoint_budget = checkpoint_budget
+        self.prune = prune
+        self.workers = os.cpu_count() if workers is None else workers
+        self.chunk_size = chunk_size
+        self.fallback_reason = None  # why the last run evaluated serially despite workers
+        self._pool = None
         self.population_size = population_size
         self.population = [Genome.random(length=10) for _ in range(population_size)]
-        self.fitness_evaluator = Fitness(unit_data)
+        # Genomes sharing an action prefix resume from its cached checkpoint
+        self.checkpoints = CheckpointTrie(checkpoint_budget) if checkpoint_budget else None
+        self.cache = FitnessCache(cache_size, cache_path) if cache_size else None
+        self.fitness_evaluator = Fitness(unit_data, checkpoints=self.checkpoints, prune=prune, cache=self.cache)
+        self.branch_and_bound = branch_and_bound
+        self.verbose = verbose
+        self.best_score = None  # best score over all generations so far
+        self.best_genome = None
+        self.ranked = []  # [(score, genome)] of the last generation, best first
+        self._target = None
         self.generation = 0
+        self.save_path = save_path
+        self.save_every = max(1, save_every)
+        self.metrics_path = metrics_path
+        self._end = 0  # generation the current run() stops at
+        self._metrics = None
 
-    def run(self, generations, target_check_fn):
-        for g in range(generations):
-            self.generation = g
+    def run(self, generations, target_check_fn, resume=False):
+        # Repeated calls with the same target continue the search. With
+        # resume, a run state at save_path replaces this one and the run it
+        # came from is finished instead.
+        if target_check_fn is not self._target:
+            self.best_score = None  # the bound only holds for its target
+            self.best_genome = None
+            self._target = target_check_fn
+        self._end = self.generation + generations
+        if resume and self.save_path is not None and os.path.exists(self.save_path):
+            self.load(self.save_path, target_check_fn)
+        if self.metrics_path is not None:
+            self._metrics = open(self.metrics_path, 'a', encoding='utf-8')
+        self._pool = self._start_pool(target_check_fn)
+        try:
+            return self._run(self._end - self.generation, target_check_fn)
+        finally:
+            if self._pool is not None:
+                self._pool.shutdown()
+                self._pool = None
+            if self._metrics is not None:
+                self._metrics.close()
+                self._metrics = None
+
+    def save(self, path):
+        # Everything needed to continue the run exactly as if it had not stopped
+        target, stable = target_key(self._target)
+        state = {
+            'version': 1,
+            'generation': self.generation,
+            'end': self._end,
+            'population': [g.actions for g in self.population],
+            'random': random.getstate(),
+            'best_score': self.best_score,
+            'best_actions': self.best_genome.actions if self.best_genome is not None else None,
+            'target': target if stable else None,
+            'cache': self.cache.state() if self.cache is not None else None,
+        }
+        _write_atomic(path, pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def load(self, path, target_check_fn):
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+        if state.get('version') != 1:
+            raise ValueError(f"Unsupported optimizer state in {path}")
+        target, stable = target_key(target_check_fn)
+        if stable and state['target'] is not None and state['target'] != target:
+            raise ValueError(f"Optimizer state in {path} is for a different target")
+
+        self.generation = state['generation']
+        self._end = state['end']
+        self.population = [Genome(list(actions)) for actions in state['population']]
+        self.population_size = len(self.population)
+        random.setstate(state['random'])
+        self.best_score = state['best_score']
+        self.best_genome = Genome(list(state['best_actions'])) if state['best_actions'] is not None else None
+        self._target = target_check_fn
+        if self.cache is not None and state['cache'] is not None:
+            self.cache.restore(state['cache'])
+
+    def _start_pool(self, target_check_fn):
+        self.fallback_reason = None
+        if self.workers <= 1 or self._batched(target_check_fn):
+            return None
+        if multiprocessing.current_process().daemon:
+            self.fallback_reason = "daemonic processes cannot start a process pool"
+            return None
+        try:
+            pickle.dumps(target_check_fn)
+        except (pickle.PicklingError, AttributeError, TypeError) as e:
+            self.fallback_reason = f"target not picklable: {e}"
+            return None
+        try:
+            return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                       initargs=(self.unit_data, self.checkpoint_budget, self.prune))
+        except (OSError, NotImplementedError, ValueError) as e:
+            self.fallback_reason = f"process pool unavailable: {e}"
+            return None
+
+    def _batched(self, target_check_fn):
+        return self.batch and getattr(target_check_fn, 'counts', None) is not None
+
+    def _evaluate(self, target_check_fn):
+        # Scores for self.population, in order
+        if self._batched(target_check_fn):
+            return self.fitness_evaluator.evaluate_batch(self.population, target_check_fn)
+
+        # The bound is fixed for the whole generation, so serial and parallel
+        # runs cut the same genomes
+        bound = self.best_score if self.branch_and_bound else None
+        fitness = self.fitness_evaluator
+        if self._pool is None:
+            return [fitness.evaluate(genome, target_check_fn, bound) for genome in self.population]
+
+        # Only cache misses go to the workers
+        scores = [fitness.lookup(genome, target_check_fn, bound) for genome in self.population]
+        todo = [i for i, score in enumerate(scores) if score is None]
+        table, codes = _encode([self.population[i] for i in todo])
+        size = self.chunk_size or max(1, len(codes) // (self.workers * 4))
+        tasks = [(table, codes[i:i + size], target_check_fn, bound) for i in range(0, len(codes), size)]
+        try:
+            results = [score for chunk in self._pool.map(_evaluate_chunk, tasks) for score in chunk]
+            for i, score in zip(todo, results):
+                scores[i] = score
+                fitness.remember(self.population[i], target_check_fn, score)
+        except (BrokenProcessPool, OSError) as e:
+            self.fallback_reason = f"process pool broke: {e}"
+            self._pool.shutdown()
+            self._pool = None
+            # The misses are already counted, so don't look them up again
+            for i in todo:
+                scores[i] = fitness.simulate(self.population[i], target_check_fn, bound)
+        return scores
+
+    def _run(self, generations, target_check_fn):
+        for _ in range(generations):
+            g = self.generation
+            self.generation += 1
             # Evaluate
-            scores = []
-            for genome in self.population:
-                score = self.fitness_evaluator.evaluate(genome, target_check_fn)
-                scores.append((score, genome))
+            started = time.perf_counter()
+            scores = list(zip(self._evaluate(target_check_fn), self.population))
+            eval_time = time.perf_counter() - started
             
             # Sort by score descending
             scores.sort(key=lambda x: x[0], reverse=True)
             
+            self.ranked = scores
             best_score = scores[0][0]
-            print(f"Generation {g}: Best Score {best_score:.1f}")
-            if g % 10 == 0:
-                 print(f"  Best Actions: {scores[0][1].actions}")
+            if self.best_score is None or best_score > self.best_score:
+                self.best_score = best_score
+                self.best_genome = scores[0][1]
+            cache_stats = self.cache.end_generation() if self.cache is not None else None
+            if self.verbose:
+                if cache_stats is not None:
+                    print(f"Generation {g}: Best Score {best_score:.1f} (cache hit rate {cache_stats['hit_rate']:.0%})")
+                else:
+                    print(f"Generation {g}: Best Score {best_score:.1f}")
+                if g % 10 == 0:
+                     print(f"  Best Actions: {scores[0][1].actions}")
+            if self._metrics is not None:
+                self._write_metrics(g, scores, eval_time, cache_stats)
 
             # Elitism: keep top 10%
             elite_count = int(self.population_size * 0.1)
@@ -43,9 +264,36 @@ class Optimizer:
                 new_pop.append(child)
             
             self.population = new_pop
+            if self.save_path is not None and (self.generation % self.save_every == 0
+                                               or self.generation == self._end):
+                self.save(self.save_path)
         
         return self.population[0]
 
+    def _write_metrics(self, g, scores, eval_time, cache_stats):
+        values = [float(score) for score, _ in scores]
+        distinct = len({tuple(genome.actions) for _, genome in scores})
+        record = {
+            'generation': g,
+            'time': time.time(),
+            'best': values[0],
+            'mean': statistics.fmean(values),
+            'median': statistics.median(values),
+            'diversity': distinct / len(scores),  # share of distinct build orders
+            'evaluations': len(scores),
+            'evals_per_sec': len(scores) / eval_time if eval_time > 0 else None,
+            'cache_hit_rate': cache_stats['hit_rate'] if cache_stats is not None else None,
+        }
+        self._metrics.write(json.dumps(record))
+        self._metrics.write('\n')
+        self._metrics.flush()
+
+    def immigrate(self, genomes):
+        # Replace the last (newest, not yet evaluated) children with copies of `genomes`
+        genomes = [Genome(list(g.actions)) for g in genomes][:self.population_size]
+        if genomes:
+            self.population[-len(genomes):] = genomes
+
     def _select(self, scores):
         # Tournament selection
         candidates = random.sample(scores, 3)
@@ -59,16 +307,14 @@ if __name__ == "__main__":
             return json.load(f)
 
     unit_data = load_data()
-    opt = Optimizer(unit_data, population_size=20)
+    opt = Optimizer(unit_data, population_size=20, batch=True)
     
     # Target: 5 Villagers (Start with 3, so need 2 more)
     # The start setup in Fitness spawns 3. 
     # Town Center starts with some, but Simulator spawns separate.
     # In run_test/Fitness default, we have 3 villagers. 
     # Let's say target is 5 villagers total.
-    def target(sim):
-        villagers = [u for u in sim.state.entities if "Villager" in u.name]
-        return len(villagers) >= 5
+    target = UnitCountTarget({"Villager (Age of Empires)": 5})
         
     best = opt.run(20, target)
     print("Final Best:", best.actions)
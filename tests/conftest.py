@@ -0,0 +1,27 @@
+import json
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+VILLAGER = "Villager (Age of Empires)"
+
+
+@pytest.fixture(scope='session')
+def unit_data():
+    with open(os.path.join(ROOT, "data", "units.json"), "r", encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def genomes():
+    from optimizer.genome import Genome
+    rng_state = random.getstate()
+    random.seed(7)
+    population = [Genome.random(length=random.randint(4, 20)) for _ in range(60)]
+    random.setstate(rng_state)
+    return population
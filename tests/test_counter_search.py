@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+from battle_sim.counter_search import CounterSearch, _key, _margin, pareto_front
+
+from conftest import ROOT
+
+KING = 'King (Age of Empires)'
+UNITS = ['Clubman', 'Slinger (Age of Empires)', 'Long Swordsman (Age of Empires)',
+         'Improved Bowman', 'Phalangite (Age of Empires)']
+ENEMY = {'Heavy Horse Archer': 10}
+
+
+@pytest.fixture
+def search():
+    return CounterSearch(os.path.join(ROOT, "data", "units.json"))
+
+
+def test_zero_cost_units_need_max_units(search):
+    with pytest.raises(ValueError, match="max_units"):
+        search.search(ENEMY, [KING, 'Clubman'], 500)
+
+    front = search.search(ENEMY, [KING, 'Clubman'], 500, max_units=4, max_simulations=1)
+    assert front and all(sum(c['army'].values()) <= 4 for c in front)
+
+
+def test_pruning_keeps_the_estimated_front(search):
+    budget = 600
+    search.search(ENEMY, UNITS, budget, max_simulations=1)
+    scored = {key for key, _ in search._estimates}
+
+    everything = list(search._compositions(UNITS, budget, None, 1))
+    assert len(scored) < len(everything)
+
+    def estimated_front(armies):
+        candidates = []
+        for army in armies:
+            est = search._estimate(army, ENEMY, _key(ENEMY))
+            margin = _margin(est, sum(army.values()), sum(ENEMY.values()))
+            candidates.append({'army': army, 'cost': sum(search.cost(army).values()), 'margin': margin})
+        return [(c['cost'], c['margin']) for c in pareto_front(candidates)]
+
+    assert estimated_front([dict(key) for key in scored]) == estimated_front(everything)
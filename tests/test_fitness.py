@@ -0,0 +1,62 @@
+from optimizer.checkpoints import CheckpointTrie
+from optimizer.fitness import MAX_TIME, CutScore, Fitness, UnitCountTarget
+
+from conftest import VILLAGER
+
+TARGET = UnitCountTarget({VILLAGER: 10})
+COMPLETED = 10000 - MAX_TIME
+
+
+def _scores(unit_data, genomes, bound=None, **options):
+    fitness = Fitness(unit_data, **options)
+    return [fitness.evaluate(g, TARGET, bound) for g in genomes]
+
+
+def test_completers_outrank_every_cut_genome(unit_data, genomes):
+    full = _scores(unit_data, genomes, prune=False)
+    bound = max(full)
+    cut = _scores(unit_data, genomes, bound, prune=False)
+
+    completers = [s for s, f in zip(cut, full) if f >= COMPLETED]
+    cut_scores = [s for s in cut if isinstance(s, CutScore)]
+    assert completers and cut_scores
+    assert min(completers) > max(cut_scores)
+
+
+def test_only_non_completers_are_cut(unit_data, genomes):
+    for target_counts in ({VILLAGER: 6}, {VILLAGER: 10}, {VILLAGER: 14}):
+        target = UnitCountTarget(target_counts)
+        exact = [Fitness(unit_data, prune=False).evaluate(g, target) for g in genomes]
+        fitness = Fitness(unit_data, prune=False)
+        for genome, real in zip(genomes, exact):
+            score = fitness.evaluate(genome, target, COMPLETED)
+            if isinstance(score, CutScore):
+                assert score <= real < COMPLETED
+            else:
+                assert score == real
+
+
+def test_checkpoints_cut_like_a_fresh_run(unit_data, genomes):
+    bound = max(_scores(unit_data, genomes, prune=False))
+    fitness = Fitness(unit_data, checkpoints=CheckpointTrie(), prune=False)
+    for g in genomes:
+        fitness.evaluate(g, TARGET)  # checkpoints from runs without a bound
+    cut = [fitness.evaluate(g, TARGET, bound) for g in genomes]
+    assert fitness.cut
+    assert cut == _scores(unit_data, genomes, bound, prune=False)
+
+
+def test_static_pruning_is_opt_in(unit_data, genomes):
+    target = UnitCountTarget({VILLAGER: 12})
+    default = Fitness(unit_data)
+    assert default.feasibility is None
+
+    pruned = Fitness(unit_data, prune=True)
+    scores = [pruned.evaluate(g, target) for g in genomes]
+    assert pruned.feasibility.rejected
+    for genome, score in zip(genomes, scores):
+        real = default.evaluate(genome, target)
+        if pruned.feasibility.check(genome.actions, target.counts)['feasible']:
+            assert score == real
+        else:
+            assert real <= score < COMPLETED
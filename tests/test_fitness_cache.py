@@ -0,0 +1,35 @@
+import gc
+import random
+
+from optimizer.fitness import Fitness
+from optimizer.fitness_cache import FitnessCache
+from optimizer.genome import Genome
+
+
+def _target(done):
+    return lambda sim: done
+
+
+def _genome():
+    random.seed(5)
+    return Genome.random(length=8)
+
+
+def test_freed_target_does_not_leave_scores_behind(unit_data):
+    cache = FitnessCache()
+    fitness = Fitness(unit_data, cache=cache)
+    genome = _genome()
+
+    done = _target(True)
+    finished = fitness.evaluate(genome, done)
+    assert len(cache) == 1
+    del done
+    gc.collect()
+    assert len(cache) == 0
+
+    # CPython hands the freed closure's id to the next one
+    never = _target(False)
+    score = fitness.evaluate(genome, never)
+    assert score != finished
+    assert score == Fitness(unit_data).evaluate(genome, never)
+
@@ -0,0 +1,47 @@
+import pytest
+
+from battle_sim.battle import Battle
+
+SCYTHE = 'Scythe Chariot'
+SWORD = 'Long Swordsman (Age of Empires)'
+ARCHER = 'Chariot Archer (Age of Empires)'
+BOWMAN = 'Bowman (Age of Empires)'
+
+
+@pytest.fixture(scope="module")
+def units(unit_data):
+    return {u['name']: u for u in unit_data}
+
+
+def fight(units, engine, a, n_a, b, n_b, stacked=False, dt=0.1):
+    battle = Battle(engine=engine)
+    for _ in range(n_a):
+        if stacked:
+            battle.add_unit('A', a, units[a], x=0.0, y=0.0)
+        else:
+            battle.add_unit('A', a, units[a])
+    for _ in range(n_b):
+        if stacked:
+            battle.add_unit('B', b, units[b], x=100.0, y=0.0)
+        else:
+            battle.add_unit('B', b, units[b])
+    return battle.run(dt=dt)
+
+
+@pytest.mark.parametrize("a, n_a, b, n_b", [
+    (SCYTHE, 9, SWORD, 10),
+    (ARCHER, 7, BOWMAN, 10),   # ranged units that outrange their targets
+    (ARCHER, 5, BOWMAN, 7),
+])
+def test_spread_armies_match_object_engine(units, a, n_a, b, n_b):
+    assert fight(units, 'group', a, n_a, b, n_b) == fight(units, 'object', a, n_a, b, n_b)
+
+
+@pytest.mark.parametrize("a, n_a, b, n_b", [
+    (SCYTHE, 9, SWORD, 10),
+    (ARCHER, 7, BOWMAN, 10),
+    ('Clubman', 60, 'Axeman (Age of Empires)', 50),
+])
+def test_stacked_armies_match_object_engine(units, a, n_a, b, n_b):
+    expected = fight(units, 'object', a, n_a, b, n_b, stacked=True)
+    assert fight(units, 'group', a, n_a, b, n_b, stacked=True) == expected
@@ -0,0 +1,26 @@
+from optimizer.fitness import UnitCountTarget
+from optimizer.islands import IslandModel
+
+from conftest import VILLAGER
+
+TARGET = UnitCountTarget({VILLAGER: 13})
+
+
+def _run(unit_data, **options):
+    model = IslandModel(unit_data, islands=2, population_size=20, migration_interval=2,
+                        seed=5, **options)
+    best = model.run(4, TARGET)
+    return best.actions, model.history, model.fallback_reason, model.island_fallbacks
+
+
+def test_island_processes_match_in_process_run(unit_data):
+    actions, history, reason, _ = _run(unit_data)
+    assert reason is None
+    assert (actions, history) == _run(unit_data, processes=False)[:2]
+
+
+def test_islands_with_worker_pools(unit_data):
+    actions, history, reason, island_reasons = _run(unit_data, workers=2)
+    assert reason is None
+    assert island_reasons == [None, None]
+    assert (actions, history) == _run(unit_data, processes=False)[:2]
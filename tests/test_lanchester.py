@@ -0,0 +1,16 @@
+import os
+
+from battle_sim.lanchester import estimate
+from battle_sim.prototype import PrototypeRegistry
+
+from conftest import ROOT
+
+
+def test_near_draw_does_not_break_atanh():
+    # The strengths compare unequal, but sqrt(strength_b / strength_a) rounds to 1
+    registry = PrototypeRegistry.from_json(os.path.join(ROOT, "data", "units.json"))
+    ours = {registry['Long Swordsman (Age of Empires)']: 4, registry['Phalangite (Age of Empires)']: 5}
+    theirs = {registry['Heavy Horse Archer']: 10}
+    result = estimate(ours, theirs)
+    assert result['winner'] == 'Draw'
+    assert result['survivors_a'] == result['survivors_b'] == 0.0
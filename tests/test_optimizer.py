@@ -0,0 +1,51 @@
+import multiprocessing
+import random
+from concurrent.futures.process import BrokenProcessPool
+
+from optimizer.fitness import Fitness, UnitCountTarget
+from optimizer.optimizer import Optimizer
+
+from conftest import VILLAGER
+
+TARGET = UnitCountTarget({VILLAGER: 9})
+
+
+def _run(unit_data, workers):
+    random.seed(11)
+    opt = Optimizer(unit_data, population_size=30, workers=workers, verbose=False)
+    best = opt.run(4, TARGET)
+    return best.actions, opt.best_score, opt.fallback_reason
+
+
+def _run_in_daemon(unit_data, queue):
+    queue.put(_run(unit_data, workers=2))
+
+
+def test_daemonic_parent_falls_back_to_serial(unit_data):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_in_daemon, args=(unit_data, queue), daemon=True)
+    process.start()
+    actions, score, reason = queue.get(timeout=120)
+    process.join()
+    assert reason and 'daemonic' in reason
+    assert (actions, score) == _run(unit_data, workers=0)[:2]
+
+
+class _BrokenPool:
+    def map(self, fn, tasks):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self):
+        pass
+
+
+def test_broken_pool_counts_each_lookup_once(unit_data):
+    random.seed(3)
+    opt = Optimizer(unit_data, population_size=20, workers=2, verbose=False)
+    serial = [Fitness(unit_data).evaluate(g, TARGET) for g in opt.population]
+
+    opt._pool = _BrokenPool()
+    assert opt._evaluate(TARGET) == serial
+    assert 'broke' in opt.fallback_reason
+    stats = opt.cache.end_generation()
+    assert (stats['hits'], stats['misses']) == (0, len(opt.population))
@@ -0,0 +1,40 @@
+from eco_sim import batch, start
+from eco_sim.entities import EntityType
+from optimizer import feasibility
+from optimizer.fitness import Fitness, UnitCountTarget
+
+from conftest import VILLAGER
+
+
+def test_fitness_start_matches_shared_constants(unit_data, genomes):
+    sim, _ = Fitness(unit_data)._start(genomes[0])
+    state = sim.state
+    assert state.resources == start.START_RESOURCES
+    assert tuple(e.name for e in state.entities if e.entity_type == EntityType.BUILDING) == start.START_BUILDINGS
+    assert tuple((e.name, e.resource_type, e.amount) for e in state.entities
+                 if e.entity_type == EntityType.RESOURCE) == start.START_NODES
+    assert tuple(e.name for e in state.entities if e.entity_type == EntityType.UNIT) == start.START_UNITS
+    assert state.max_population == start.START_MAX_POPULATION
+
+
+def test_batch_and_feasibility_use_the_same_start():
+    for name in ('START_RESOURCES', 'START_BUILDINGS', 'START_NODES', 'START_UNITS'):
+        assert getattr(batch, name) is getattr(start, name)
+        assert getattr(feasibility, name) is getattr(start, name)
+
+
+def test_batch_scores_match_fitness(unit_data, genomes):
+    target = UnitCountTarget({VILLAGER: 7})
+    for prune in (False, True):
+        expected = [Fitness(unit_data, prune=prune).evaluate(g, target) for g in genomes]
+        assert Fitness(unit_data, prune=prune).evaluate_batch(genomes, target) == expected
+
+
+def test_feasibility_never_rejects_a_completing_genome(unit_data, genomes):
+    target = UnitCountTarget({VILLAGER: 7})
+    fitness = Fitness(unit_data, prune=False)
+    check = feasibility.FeasibilityFilter(unit_data).check
+    completing = [g for g in genomes if fitness.evaluate(g, target) >= 10000 - 600]
+    assert completing
+    for genome in completing:
+        assert check(genome.actions, target.counts)['feasible']
@@ -0,0 +1,33 @@
+import random
+
+from eco_sim.entities import EntityType, Unit, UnitState
+from eco_sim.state import GameState
+
+
+def _scan(state, prefix):
+    # What idle_unit used to do: every idle unit, lowest id first
+    idle = [u for u in state.entities
+            if u.entity_type == EntityType.UNIT and u.state == UnitState.IDLE and u.name.startswith(prefix)]
+    return min(idle, key=lambda u: u.id) if idle else None
+
+
+def test_idle_unit_matches_a_scan():
+    rng = random.Random(4)
+    state = GameState()
+    names = ["Villager (Age of Empires)", "Villager (female)", "Clubman"]
+    for _ in range(2000):
+        units = [e for e in state.entities if e.entity_type == EntityType.UNIT]
+        roll = rng.random()
+        if roll < 0.2 or not units:
+            state.add_entity(Unit(rng.choice(names)))
+        elif roll < 0.25:
+            state.remove_entity(rng.choice(units))
+        else:
+            rng.choice(units).state = rng.choice(list(UnitState))
+        for prefix in ("Villager", "Clubman", ""):
+            assert state.idle_unit(prefix) is _scan(state, prefix)
+
+    copy = GameState.from_snapshot(state.snapshot())
+    for prefix in ("Villager", "Clubman", ""):
+        expected = _scan(state, prefix)
+        assert (copy.idle_unit(prefix).id if expected else None) == (expected.id if expected else None)
@@ -1,6 +1,7 @@
 import json
 import os
 from eco_sim.simulator import Simulator
+from eco_sim.events import PrintSink
 from eco_sim.entities import Building, ResourceType, ResourceNode, UnitState
 
 def load_data():
@@ -9,7 +10,7 @@ def load_data():
         return json.load(f)
 
 def run_test():
-    sim = Simulator()
+    sim = Simulator(events=PrintSink())
     units_data = load_data()
     sim.load_unit_data(units_data)
     